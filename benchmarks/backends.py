@@ -0,0 +1,90 @@
+"""Check every filter backend against SciPy and time it.
+
+The conformance check filters a multichannel signal with every filter type
+and order in FILTER_ORDERS, in one call and in two chunks carrying the
+state, and compares both with scipy.signal.sosfilt. Then every backend is
+timed single-threaded and with the channels split over a thread pool.
+
+    python -m benchmarks.backends [--channels N] [--samples N] [--workers N]
+
+Exits with 1 when a backend doesn't conform.
+"""
+import argparse
+import sys
+import timeit
+
+import numpy as np
+from scipy.signal import sosfilt, sosfilt_zi
+
+from filter.backends import available_backends, get_backend, parallel_sosfilt
+from filter.engine import FILTER_ORDERS, FILTER_TYPES, design_filter
+
+
+# largest accepted error relative to the norm of the SciPy output
+TOLERANCE = 1e-9
+
+
+def conformance(name, channels=3, samples=4096, fs=1000.0, lowcut=50.0, highcut=200.0):
+    """Return (design, relative error) of the designs `name` gets wrong."""
+    kernel = get_backend(name)
+    rng = np.random.default_rng(0)
+    data = rng.standard_normal((channels, samples))
+    half = samples // 2
+    failures = []
+    for filter_type in FILTER_TYPES:
+        for order in FILTER_ORDERS:
+            sos = design_filter(filter_type, order, lowcut, highcut, fs)
+            reference = sosfilt(sos, data, axis=-1)
+            zi = sosfilt_zi(sos)[:, np.newaxis, :] * data[np.newaxis, :, :1]
+            first, zf = kernel(sos, data[:, :half], axis=-1, zi=zi)
+            second, _ = kernel(sos, data[:, half:], axis=-1, zi=zf)
+            head, state = sosfilt(sos, data[:, :half], axis=-1, zi=zi)
+            tail, _ = sosfilt(sos, data[:, half:], axis=-1, zi=state)
+            expected = np.concatenate([head, tail], axis=-1)
+            # time axis first, the kernel has to honour `axis`
+            transposed = kernel(sos, data.T, axis=0).T
+            for output, target in ((kernel(sos, data, axis=-1), reference), (transposed, reference),
+                                   (np.concatenate([first, second], axis=-1), expected)):
+                error = np.linalg.norm(output - target) / np.linalg.norm(target)
+                if not error <= TOLERANCE:
+                    failures.append(("{} n={}".format(filter_type, order), error))
+                    break
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--channels", type=int, default=64)
+    parser.add_argument("--samples", type=int, default=48000)
+    parser.add_argument("--fs", type=float, default=48000.0)
+    parser.add_argument("--order", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=None, help="threads (default: all cores)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    failed = False
+    for name in available_backends():
+        failures = conformance(name)
+        failed = failed or bool(failures)
+        print("{:<8} {}".format(name, "conforms" if not failures else "FAILS"))
+        for design, error in failures:
+            print("    {:<16} rel.err {:.3e}".format(design, error))
+
+    rng = np.random.default_rng(0)
+    data = rng.standard_normal((args.channels, args.samples))
+    sos = design_filter("bandpass", args.order, 500.0, 2000.0, args.fs)
+    print("\n{} channels x {} samples, order {}".format(args.channels, args.samples, args.order))
+    for name in available_backends():
+        kernel = get_backend(name)
+        kernel(sos, data[:1, :16], axis=-1)  # compile / warm up
+        single = min(timeit.repeat(lambda: kernel(sos, data, axis=-1), repeat=args.repeat, number=1))
+        threaded = min(timeit.repeat(lambda: parallel_sosfilt(sos, data, backend=name, workers=args.workers),
+                                     repeat=args.repeat, number=1))
+        samples = args.channels * args.samples
+        print("{:<8} {:>9.3f} s {:>9.1f} Msamples/s | threads {:>9.3f} s {:>9.1f} Msamples/s".format(
+            name, single, samples / single / 1e6, threaded, samples / threaded / 1e6))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""Compare per-channel filtering loops with the vectorized batch API.
+
+    python -m benchmarks.batch [--channels N] [--samples N]
+"""
+import argparse
+import timeit
+
+import numpy as np
+
+from filter import engine
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--channels", type=int, default=512)
+    parser.add_argument("--samples", type=int, default=48000)
+    parser.add_argument("--fs", type=float, default=48000.0)
+    parser.add_argument("--order", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    data = rng.standard_normal((args.channels, args.samples))
+    params = dict(filter_type="bandpass", order=args.order, lowcut=500.0, highcut=2000.0, fs=args.fs)
+
+    def loop_redesign():
+        engine.clear_design_cache()
+        for channel in data:
+            engine.filter_signal(channel, **params)
+            engine.clear_design_cache()
+
+    def loop():
+        for channel in data:
+            engine.filter_signal(channel, **params)
+
+    def vectorized():
+        engine.filter_signal(data, axis=-1, **params)
+
+    sweep = [dict(params, lowcut=lowcut) for lowcut in np.linspace(100.0, 1500.0, 8)]
+
+    def sweep_loop():
+        for p in sweep:
+            for channel in data:
+                engine.filter_signal(channel, **p)
+
+    def sweep_batch():
+        engine.filter_batch(data, sweep, axis=-1)
+
+    cases = [
+        ("per-channel loop, redesign", loop_redesign, args.channels),
+        ("per-channel loop, cached", loop, args.channels),
+        ("vectorized (channels, samples)", vectorized, args.channels),
+        ("sweep x channels loop", sweep_loop, args.channels * len(sweep)),
+        ("filter_batch sweep", sweep_batch, args.channels * len(sweep)),
+    ]
+    print("{} channels x {} samples, order {}".format(args.channels, args.samples, args.order))
+    for name, func, signals in cases:
+        seconds = min(timeit.repeat(func, repeat=args.repeat, number=1))
+        print("{:<32} {:>9.3f} s {:>12.1f} Msamples/s".format(
+            name, seconds, signals * args.samples / seconds / 1e6))
+
+
+if __name__ == "__main__":
+    main()
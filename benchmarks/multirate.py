@@ -0,0 +1,78 @@
+"""Compare full-rate filtering with the multirate (decimated) path.
+
+For narrowband lowpass and bandpass designs prints the decimation factor
+(automatic unless --factor is given), the time of both paths, the speedup
+and the relative error of the multirate output against the full-rate one,
+measured away from the first and last EDGE of the signal where both paths
+start and end their transients differently.
+Designs the cost model doesn't decimate run the plain path (factor 1).
+
+    python -m benchmarks.multirate [--samples N] [--fs FS] [--order N] [--factor N]
+"""
+import argparse
+import timeit
+
+import numpy as np
+
+from filter.engine import filter_signal
+from filter.multirate import decimation_factor, filter_multirate
+
+
+# (filter type, lowcut, highcut) as fractions of the sample rate
+CASES = (
+    ("lowpass", 0.001, None),
+    ("lowpass", 0.005, None),
+    ("lowpass", 0.02, None),
+    ("lowpass", 0.1, None),
+    ("bandpass", 0.0005, 0.002),
+    ("bandpass", 0.005, 0.02),
+    ("highpass", None, 0.01),
+)
+
+# fraction of the signal left out of the error at each end
+EDGE = 0.1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=480000)
+    parser.add_argument("--fs", type=float, default=48000.0)
+    parser.add_argument("--order", type=int, default=16)
+    parser.add_argument("--mode", choices=("causal", "zero-phase"), default="zero-phase")
+    parser.add_argument("--factor", type=int, help="force a decimation factor")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    data = rng.standard_normal(args.samples)
+
+    print("{:<9} {:>9} {:>9} {:>6} {:>10} {:>10} {:>8} {:>10}".format(
+        "type", "lowcut", "highcut", "factor", "full ms", "multi ms", "speedup", "rel.err"))
+    for filter_type, low, high in CASES:
+        lowcut = low * args.fs if low is not None else None
+        highcut = high * args.fs if high is not None else None
+        params = dict(filter_type=filter_type, order=args.order, lowcut=lowcut, highcut=highcut, fs=args.fs,
+                      mode=args.mode)
+
+        factor = args.factor or decimation_factor(filter_type, args.order, lowcut, highcut, args.fs, mode=args.mode)
+        if filter_type not in ("lowpass", "bandpass"):
+            factor = 1
+
+        full = min(timeit.repeat(lambda: filter_signal(data, **params), repeat=args.repeat, number=1))
+        try:
+            multi = min(timeit.repeat(lambda: filter_multirate(data, factor=factor, **params), repeat=args.repeat,
+                                      number=1))
+        except ValueError as e:
+            print("{:<9} {}".format(filter_type, e))
+            continue
+        inner = slice(int(args.samples * EDGE), int(args.samples * (1 - EDGE)))
+        reference = filter_signal(data, **params)[inner]
+        error = np.linalg.norm(filter_multirate(data, factor=factor, **params)[inner] - reference) / np.linalg.norm(reference)
+
+        print("{:<9} {:>9} {:>9} {:>6} {:>10.2f} {:>10.2f} {:>8.1f} {:>10.3e}".format(
+            filter_type, "{:g}".format(lowcut) if lowcut else "-", "{:g}".format(highcut) if highcut else "-",
+            factor, full * 1e3, multi * 1e3, full / multi, error))
+
+
+if __name__ == "__main__":
+    main()
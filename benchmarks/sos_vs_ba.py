@@ -0,0 +1,55 @@
+"""Compare the SOS and transfer-function (ba) filtering paths.
+
+For every filter type and every order in FILTER_ORDERS prints the cost per
+sample of both paths, the largest pole radius of the ba design and the
+relative error of the ba output against the SOS output.
+
+    python -m benchmarks.sos_vs_ba [--samples N] [--fs FS]
+"""
+import argparse
+import timeit
+
+import numpy as np
+from scipy.signal import tf2zpk
+
+from filter.engine import FILTER_ORDERS, FILTER_TYPES, design_filter, filter_signal
+
+
+def measure(data, filter_type, order, lowcut, highcut, fs, output, repeat):
+    timer = timeit.Timer(lambda: filter_signal(data, filter_type, order, lowcut, highcut, fs, output=output))
+    seconds = min(timer.repeat(repeat=repeat, number=1))
+    return seconds / len(data) * 1e9
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=480000)
+    parser.add_argument("--fs", type=float, default=48000.0)
+    parser.add_argument("--lowcut", type=float, default=500.0)
+    parser.add_argument("--highcut", type=float, default=2000.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    data = rng.standard_normal(args.samples)
+
+    print("{:<9} {:>5} {:>12} {:>12} {:>10} {:>12}".format(
+        "type", "order", "sos ns/samp", "ba ns/samp", "ba |p|max", "ba rel.err"))
+    for filter_type in FILTER_TYPES:
+        for order in FILTER_ORDERS:
+            sos_cost = measure(data, filter_type, order, args.lowcut, args.highcut, args.fs, "sos", args.repeat)
+            ba_cost = measure(data, filter_type, order, args.lowcut, args.highcut, args.fs, "ba", args.repeat)
+
+            b, a = design_filter(filter_type, order, args.lowcut, args.highcut, args.fs, output="ba")
+            _, poles, _ = tf2zpk(b, a)
+            reference = filter_signal(data, filter_type, order, args.lowcut, args.highcut, args.fs, output="sos")
+            with np.errstate(all="ignore"):
+                ba = filter_signal(data, filter_type, order, args.lowcut, args.highcut, args.fs, output="ba")
+                error = np.linalg.norm(ba - reference) / np.linalg.norm(reference)
+
+            print("{:<9} {:>5} {:>12.2f} {:>12.2f} {:>10.6f} {:>12.3e}".format(
+                filter_type, order, sos_cost, ba_cost, np.max(np.abs(poles)), error))
+
+
+if __name__ == "__main__":
+    main()
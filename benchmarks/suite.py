@@ -0,0 +1,176 @@
+"""Benchmark suite for synthesis, design, filtering and rendering.
+
+Times the signal generator, every butter_* design, every filter call and a
+headless Agg render of both canvases over a matrix of sample rates,
+durations, FILTER_ORDERS and FILTER_TYPES. Reports throughput and peak
+memory, and can save the results as a JSON baseline or compare against
+one saved by an earlier version.
+
+    python -m benchmarks.suite [--quick] [--save FILE] [--compare FILE]
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import timeit
+import tracemalloc
+
+import numpy as np
+import scipy
+
+from filter import engine
+from filter.signals import Sine, synthesize
+
+
+SAMPLE_RATES = (30, 1000, 8000, 48000)
+DURATIONS = (1, 10, 60)
+
+# lowcut/highcut as fractions of the sample rate, valid for every type
+LOWCUT = 0.05
+HIGHCUT = 0.2
+
+# a result this much slower than the baseline is reported as a regression
+REGRESSION = 1.2
+
+
+def measure(func, samples, repeat):
+    """Return best time, throughput and peak traced memory of `func()`."""
+    func()  # warm up caches and imports
+    seconds = min(timeit.repeat(func, repeat=repeat, number=1))
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": seconds, "samples_per_sec": samples / seconds if seconds > 0 else float("inf"),
+            "peak_bytes": peak}
+
+
+def signal_cases(fs, duration):
+    samples = int(fs * duration)
+    components = [Sine(1.0, fs * 0.01), Sine(1.0, fs * 0.3)]
+    x = synthesize(components, duration, fs).data
+    yield "synthesize fs={} dur={}".format(fs, duration), samples, lambda: synthesize(components, duration, fs)
+
+    for filter_type in engine.FILTER_TYPES:
+        for order in engine.FILTER_ORDERS:
+            params = dict(filter_type=filter_type, order=order, lowcut=fs * LOWCUT, highcut=fs * HIGHCUT, fs=fs)
+            name = "filter {} n={} fs={} dur={}".format(filter_type, order, fs, duration)
+            yield name, samples, lambda params=params: engine.filter_signal(x, **params)
+
+
+def design_cases(fs):
+    for filter_type in engine.FILTER_TYPES:
+        for order in engine.FILTER_ORDERS:
+            params = dict(filter_type=filter_type, order=order, lowcut=fs * LOWCUT, highcut=fs * HIGHCUT, fs=fs)
+
+            def uncached(params=params):
+                engine.clear_design_cache()
+                engine.design_filter(**params)
+
+            yield "design {} n={} fs={}".format(filter_type, order, fs), 1, uncached
+            yield ("design cached {} n={} fs={}".format(filter_type, order, fs), 1,
+                   lambda params=params: engine.design_filter(**params))
+
+
+def render_cases(fs, duration):
+    """Yield plot + Agg draw of both canvases, needs PyQt5 (offscreen)."""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5 import QtWidgets
+    from filter.plots import FilteredSignalPlot, UnfilteredSignalPlot
+
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv[:1])
+    input_canvas = UnfilteredSignalPlot()
+    output_canvas = FilteredSignalPlot()
+    input_canvas.resize(1200, 200)
+    output_canvas.resize(1200, 200)
+    samples = int(fs * duration)
+
+    def sine_generator():
+        input_canvas.sineGenerator(fs, fs * 0.01, 1.0, duration)
+
+    def render():
+        sine = input_canvas.plot(Am1=1, Fs1=fs * 0.01, Am2=1, Fs2=fs * 0.3, sampleFrequency=fs, duration=duration)
+        output_canvas.plot(order=4, lowcut=fs * LOWCUT, highcut=fs * HIGHCUT, filterType="lowpass",
+                           samplingRate=fs, unfilteredSig=sine, duration=duration)
+        input_canvas.draw()
+        output_canvas.draw()
+        app.processEvents()
+
+    yield "sineGenerator fs={} dur={}".format(fs, duration), samples, sine_generator
+    yield "render fs={} dur={}".format(fs, duration), samples, render
+
+
+def run(args):
+    results = {}
+
+    def record(name, samples, func):
+        results[name] = measure(func, samples, args.repeat)
+        r = results[name]
+        print("{:<44} {:>10.3f} ms {:>14.0f} samples/s {:>10.1f} KiB".format(
+            name, r["seconds"] * 1e3, r["samples_per_sec"], r["peak_bytes"] / 1024))
+
+    sample_rates = SAMPLE_RATES[-2:] if args.quick else SAMPLE_RATES
+    durations = DURATIONS[:1] if args.quick else DURATIONS
+    for fs in sample_rates:
+        for case in design_cases(fs):
+            record(*case)
+        for duration in durations:
+            for case in signal_cases(fs, duration):
+                record(*case)
+            if args.render:
+                try:
+                    for case in render_cases(fs, duration):
+                        record(*case)
+                except ImportError as e:
+                    print("render skipped: {}".format(e))
+                    args.render = False
+    return results
+
+
+def compare(results, baseline):
+    """Print the speed ratio of every case also found in `baseline`."""
+    regressions = 0
+    print("\n{:<44} {:>10} {:>10} {:>8}".format("case", "base ms", "now ms", "ratio"))
+    for name, r in results.items():
+        if name not in baseline:
+            continue
+        ratio = r["seconds"] / baseline[name]["seconds"]
+        flag = ""
+        if ratio > REGRESSION:
+            regressions += 1
+            flag = "  SLOWER"
+        print("{:<44} {:>10.3f} {:>10.3f} {:>8.2f}{}".format(
+            name, baseline[name]["seconds"] * 1e3, r["seconds"] * 1e3, ratio, flag))
+    print("{} regression(s) above {:.0%}".format(regressions, REGRESSION - 1))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="two sample rates and one duration only")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-render", dest="render", action="store_false", help="skip the Qt/Agg canvases")
+    parser.add_argument("--save", metavar="FILE", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="FILE", help="compare against a JSON baseline")
+    args = parser.parse_args(argv)
+
+    started = time.time()
+    results = run(args)
+    if args.save:
+        meta = {"created": started, "python": platform.python_version(), "numpy": np.__version__,
+                "scipy": scipy.__version__, "machine": platform.machine(), "processor": platform.processor()}
+        with open(args.save, "w") as f:
+            json.dump({"meta": meta, "results": results}, f, indent=1, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        return 1 if compare(results, baseline) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""Pluggable kernels for the causal second-order-sections filter.
+
+A backend is a function with the signature of `scipy.signal.sosfilt`,
+`kernel(sos, x, axis=-1, zi=None)`, returning `y` or `(y, zf)` when `zi`
+is given. The engine looks backends up by name:
+
+    "scipy" - scipy.signal.sosfilt, the default
+    "numba" - a JIT-compiled biquad cascade running without the GIL
+              (filter.biquad), available when numba is installed and
+              imported on first use
+
+`parallel_sosfilt` splits the channels of a signal over a thread pool;
+with a kernel that releases the GIL the channels run truly in parallel.
+"""
+import importlib.util
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from scipy.signal import sosfilt
+
+
+DEFAULT_BACKEND = "scipy"
+
+# name -> kernel, in registration order
+_backends = OrderedDict()
+
+
+def register_backend(name, kernel):
+    """Make `kernel` available to the engine as backend `name`."""
+    _backends[name] = kernel
+
+
+def available_backends():
+    """Return the names of the registered and the installed lazy backends."""
+    return tuple(_backends) + tuple(name for name in _lazy_backends if name not in _backends)
+
+
+def get_backend(name=None):
+    """Return the kernel registered as `name`, None is DEFAULT_BACKEND."""
+    if name is None:
+        name = DEFAULT_BACKEND
+    if name not in _backends:
+        if name not in _lazy_backends:
+            raise ValueError("Filter backend '{}' is not supported.".format(name))
+        register_backend(name, _lazy_backends[name]())
+    return _backends[name]
+
+
+register_backend("scipy", sosfilt)
+
+
+def _load_numba():
+    from filter.biquad import numba_sosfilt
+    return numba_sosfilt
+
+
+# name -> loader of backends imported on first use, so numba's import cost
+# is only paid when its kernel is asked for
+_lazy_backends = OrderedDict()
+if importlib.util.find_spec("numba") is not None:
+    _lazy_backends["numba"] = _load_numba
+
+
+def parallel_sosfilt(sos, x, axis=-1, backend=None, workers=None):
+    """Filter the channels of `x` in a thread pool and return the output.
+
+    Every axis but `axis` counts as channels; they are split into one
+    slab per worker and each slab is filtered with the `backend` kernel.
+    """
+    kernel = get_backend(backend)
+    x = np.asarray(x)
+    moved = np.moveaxis(x, axis, -1)
+    rows = moved.reshape(-1, moved.shape[-1])
+    workers = min(workers or os.cpu_count() or 1, rows.shape[0])
+    if workers <= 1:
+        return kernel(sos, x, axis=axis)
+    slabs = np.array_split(rows, workers)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        filtered = list(pool.map(lambda slab: kernel(sos, slab, axis=-1), slabs))
+    return np.moveaxis(np.concatenate(filtered).reshape(moved.shape), -1, axis)
@@ -0,0 +1,58 @@
+"""JIT-compiled biquad cascade, the "numba" backend of filter.backends.
+
+Importing this module imports numba; the backend registry only does so
+when the kernel is first asked for.
+"""
+import numba
+import numpy as np
+
+
+@numba.njit(nogil=True, cache=True)
+def _biquad_cascade(sos, x, zi):
+    """Filter the rows of `x` in place, direct form II transposed.
+
+    `sos` is normalized to a0 == 1, `zi` has the shape
+    (channels, sections, 2) and is updated to the final state.
+    """
+    channels, samples = x.shape
+    for c in range(channels):
+        for s in range(sos.shape[0]):
+            b0, b1, b2 = sos[s, 0], sos[s, 1], sos[s, 2]
+            a1, a2 = sos[s, 4], sos[s, 5]
+            z0, z1 = zi[c, s, 0], zi[c, s, 1]
+            for n in range(samples):
+                xn = x[c, n]
+                yn = b0 * xn + z0
+                z0 = b1 * xn - a1 * yn + z1
+                z1 = b2 * xn - a2 * yn
+                x[c, n] = yn
+            zi[c, s, 0], zi[c, s, 1] = z0, z1
+
+
+def numba_sosfilt(sos, x, axis=-1, zi=None):
+    """`scipy.signal.sosfilt` on top of the compiled biquad cascade.
+
+    Neither `x` nor `zi` is modified, the kernel works on copies.
+    """
+    sos = np.asarray(sos)
+    x = np.asarray(x)
+    dtype = np.result_type(sos.dtype, x.dtype, np.float32)
+    sos = np.ascontiguousarray(sos / sos[:, 3:4], dtype=dtype)
+    sections = sos.shape[0]
+    # (channels, samples) rows of a contiguous copy, filtered in place
+    moved = np.moveaxis(x, axis, -1)
+    y = np.array(moved.reshape(-1, moved.shape[-1]), dtype=dtype, order="C")
+    if zi is None:
+        state = np.zeros((y.shape[0], sections, 2), dtype=dtype)
+    else:
+        # scipy's zi is x.shape with the time axis replaced by 2, plus a
+        # leading sections axis; np.array always copies, so the caller's
+        # state is never updated in place
+        state = np.moveaxis(np.asarray(zi), axis % x.ndim + 1, -1).reshape(sections, -1, 2)
+        state = np.array(state.transpose(1, 0, 2), dtype=dtype, order="C")
+    _biquad_cascade(sos, y, state)
+    y = np.moveaxis(y.reshape(moved.shape), -1, axis)
+    if zi is None:
+        return y
+    zf = state.transpose(1, 0, 2).reshape((sections,) + moved.shape[:-1] + (2,))
+    return y, np.moveaxis(zf, -1, axis % x.ndim + 1)
@@ -0,0 +1,166 @@
+"""Command-line entry point.
+
+    python -m filter                 # start the GUI
+    python -m filter run [options] FILE [FILE ...]
+
+`run` filters signal files without the GUI, streaming them block by block
+through the same Butterworth engine and spreading files over a process
+pool.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from filter import fileio
+from filter.backends import DEFAULT_BACKEND, available_backends
+from filter.engine import (FILTER_MODES, FILTER_TYPES, StreamingFilter,
+                           design_filter, iter_zero_phase, zero_phase_chunked)
+
+
+def output_path(path, output_dir, suffix, fmt):
+    """Return where the filtered version of `path` is written."""
+    stem, extension = os.path.splitext(os.path.basename(path))
+    if fmt is not None:
+        extension = "." + fmt
+    directory = output_dir if output_dir is not None else os.path.dirname(path)
+    return os.path.join(directory, stem + suffix + extension)
+
+
+def filter_file(src, dst, design, fs=None, input_format=None, output_format=None,
+                dtype="float64", channels=1, blocksize=fileio.BLOCK_SIZE, initial="zero", mode="causal",
+                backend=None):
+    """Stream-filter file `src` into `dst` and return (dst, frames, seconds).
+
+    `design` holds the filter_type, order, lowcut and highcut keywords.
+    WAV files use their own sample rate when `fs` is None. In "zero-phase"
+    mode the file is filtered in overlapping blocks; `backend` is the
+    kernel of the causal path.
+    """
+    started = time.perf_counter()
+    input_format = input_format or fileio.detect_format(src)
+    output_format = output_format or fileio.detect_format(dst)
+    if fs is None:
+        if input_format != "wav":
+            raise ValueError("Sample frequency is required for {} files.".format(input_format))
+        fs = fileio.wav_rate(src)
+
+    if mode == "zero-phase":
+        frames = _filter_file_zero_phase(src, dst, design, fs, input_format, output_format, dtype, channels, blocksize)
+        return dst, frames, time.perf_counter() - started
+    elif mode != "causal":
+        raise ValueError("Filter mode '{}' is not supported.".format(mode))
+
+    streaming_filter = StreamingFilter(fs=fs, initial=initial, axis=0, backend=backend, **design)
+    if input_format in fileio.MEMMAP_FORMATS and output_format in fileio.MEMMAP_FORMATS:
+        # zero-copy path: block views of the input into a preallocated output
+        data = fileio.open_recording(src, input_format, dtype=dtype, channels=channels)
+        shape = data.shape if output_format == "npy" else (data.shape[0], data.size // max(data.shape[0], 1))
+        output = fileio.create_output(dst, shape, output_format, dtype=dtype)
+        fileio.filter_mapped(data, output, streaming_filter, blocksize=blocksize)
+        frames = data.shape[0]
+        del output
+    else:
+        blocks = fileio.read_blocks(src, input_format, blocksize=blocksize, dtype=dtype, channels=channels)
+        with fileio.BlockWriter(dst, output_format, fs=fs, dtype=dtype) as writer:
+            for filtered in streaming_filter.stream(blocks):
+                writer.write(filtered)
+        frames = writer.frames
+    return dst, frames, time.perf_counter() - started
+
+
+def _filter_file_zero_phase(src, dst, design, fs, input_format, output_format, dtype, channels, blocksize):
+    sos = design_filter(fs=fs, **design)
+    if input_format == "csv":
+        data = np.loadtxt(src, delimiter=",", ndmin=2)
+    else:
+        data = fileio.open_recording(src, input_format, dtype=dtype, channels=channels)
+    if input_format == "wav":
+        # integer PCM is scaled up front, like CSV it is then held in memory
+        data = fileio.pcm_to_float(data)
+    # time is the first axis, a 1-D input keeps its (frames,) shape
+    if output_format in fileio.MEMMAP_FORMATS:
+        output = fileio.create_output(dst, data.shape, output_format, dtype=dtype)
+        zero_phase_chunked(sos, data, blocksize, axis=0, out=output)
+        output.flush()
+        del output
+    else:
+        with fileio.BlockWriter(dst, output_format, fs=fs, dtype=dtype) as writer:
+            for block in iter_zero_phase(sos, data, blocksize, axis=0):
+                writer.write(block)
+    return data.shape[0]
+
+
+def _filter_file_task(args):
+    return filter_file(*args[:3], **args[3])
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m filter", description="Simple Butterworth Filter")
+    commands = parser.add_subparsers(dest="command")
+
+    commands.add_parser("gui", help="start the graphical application (default)")
+
+    run = commands.add_parser("run", help="filter signal files without the GUI")
+    run.add_argument("files", nargs="+", help="input signal files")
+    run.add_argument("-t", "--type", dest="filter_type", choices=FILTER_TYPES, default="lowpass")
+    run.add_argument("-n", "--order", type=int, default=1)
+    run.add_argument("--lowcut", type=float, help="lowpass cutoff / lower band edge [hz]")
+    run.add_argument("--highcut", type=float, help="highpass cutoff / upper band edge [hz]")
+    run.add_argument("--fs", type=float, help="sample frequency [hz], read from WAV files when omitted")
+    run.add_argument("--input-format", choices=fileio.FILE_FORMATS, help="default: from the file extension")
+    run.add_argument("--output-format", choices=fileio.FILE_FORMATS, help="default: same as the input")
+    run.add_argument("--dtype", default="float64", help="sample type of raw files (default: float64)")
+    run.add_argument("--channels", type=int, default=1, help="interleaved channels of raw files (default: 1)")
+    run.add_argument("--blocksize", type=int, default=fileio.BLOCK_SIZE, help="frames filtered at once")
+    run.add_argument("--mode", choices=FILTER_MODES, default="causal", help="default: causal")
+    run.add_argument("--initial", choices=StreamingFilter.INITIAL_STATES, default="zero",
+                     help="causal filter state at the start of every file (default: zero)")
+    run.add_argument("--backend", choices=available_backends(), default=DEFAULT_BACKEND,
+                     help="causal filter kernel (default: {})".format(DEFAULT_BACKEND))
+    run.add_argument("-o", "--output-dir", help="default: next to the input file")
+    run.add_argument("--suffix", default="_filtered", help="appended to the output file name")
+    run.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="worker processes")
+    return parser
+
+
+def run(args):
+    if args.filter_type in ("lowpass", "bandpass", "bandstop") and args.lowcut is None:
+        raise SystemExit("--lowcut is required for {} filters".format(args.filter_type))
+    if args.filter_type in ("highpass", "bandpass", "bandstop") and args.highcut is None:
+        raise SystemExit("--highcut is required for {} filters".format(args.filter_type))
+    if args.output_dir is not None:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    design = dict(filter_type=args.filter_type, order=args.order, lowcut=args.lowcut, highcut=args.highcut)
+    options = dict(fs=args.fs, input_format=args.input_format, output_format=args.output_format or args.input_format,
+                   dtype=args.dtype, channels=args.channels, blocksize=args.blocksize, initial=args.initial,
+                   mode=args.mode, backend=args.backend)
+    tasks = [(src, output_path(src, args.output_dir, args.suffix, args.output_format), design, options)
+             for src in args.files]
+
+    failed = 0
+    with ProcessPoolExecutor(max_workers=max(1, min(args.jobs or 1, len(tasks)))) as pool:
+        futures = [(task[0], pool.submit(_filter_file_task, task)) for task in tasks]
+        for src, future in futures:
+            try:
+                dst, frames, seconds = future.result()
+            except (OSError, ValueError) as e:
+                failed += 1
+                print("{}: {}".format(src, e), file=sys.stderr)
+            else:
+                print("{} -> {} ({} frames, {:.3f} s)".format(src, dst, frames, seconds))
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "run":
+        return run(args)
+    # the GUI pulls in PyQt5 and matplotlib, so it is imported only here
+    from filter.main import main as gui
+    gui()
+    return 0
@@ -0,0 +1,352 @@
+"""Headless Butterworth filter engine.
+
+Pure NumPy/SciPy designs and filtering calls used by the GUI canvases.
+This module does not import PyQt5, matplotlib or pandas, so it can be
+used from batch jobs and on headless worker nodes.
+"""
+from functools import lru_cache
+
+import numpy as np
+from scipy.signal import (butter, filtfilt, lfilter, lfilter_zi, sosfilt_zi,
+                          sosfiltfilt)
+
+from filter.backends import get_backend
+
+
+FILTER_TYPES = ("lowpass", "highpass", "bandpass", "bandstop")
+FILTER_ORDERS = (1, 2, 4, 8, 10, 16)
+
+# 'sos' - cascaded second-order sections, stable for high orders (default)
+# 'ba'  - transfer function numerator/denominator
+FILTER_OUTPUTS = ("sos", "ba")
+
+# 'causal'     - single forward pass, phase-shifted output
+# 'zero-phase' - forward-backward pass, no phase shift, squared magnitude
+FILTER_MODES = ("causal", "zero-phase")
+
+# relative size of the impulse response tail treated as decayed
+DECAY_TOLERANCE = 1e-12
+# chunked zero-phase blocks hold at least this many paddings, so the padding
+# filtered twice per block stays a small fraction of the work
+ZERO_PHASE_BLOCK_PADDINGS = 8
+
+
+# number of designs kept by the coefficient cache
+DESIGN_CACHE_SIZE = 256
+
+
+@lru_cache(maxsize=DESIGN_CACHE_SIZE)
+def _cached_design(order, wn, btype, output):
+    return butter(order, wn, btype=btype, analog=False, output=output)
+
+
+def _design(order, wn, btype, output):
+    """Design a Butterworth filter through the LRU coefficient cache.
+
+    The key is the normalized cutoff(s), order, band type and output form,
+    so the same design requested at a different `fs` with proportional
+    cutoffs is a cache hit as well. Copies are returned, so callers can't
+    corrupt cached coefficients.
+    """
+    if output not in FILTER_OUTPUTS:
+        raise ValueError("Filter output '{}' is not supported.".format(output))
+    wn = tuple(float(w) for w in np.atleast_1d(wn))
+    if len(wn) == 1:
+        wn = wn[0]
+    coefficients = _cached_design(int(order), wn, btype, output)
+    if output == "sos":
+        return coefficients.copy()
+    return tuple(c.copy() for c in coefficients)
+
+
+def design_cache_info():
+    """Return hits, misses, maxsize and currsize of the coefficient cache."""
+    return _cached_design.cache_info()
+
+
+def clear_design_cache():
+    """Drop every cached design and reset the hit/miss counters."""
+    _cached_design.cache_clear()
+
+
+def _match_dtype(y, data):
+    # filter in float64, float32 coefficients of narrowband designs underflow;
+    # only the output of a float32 signal is handed back as float32
+    if getattr(data, "dtype", None) == np.float32:
+        return y.astype(np.float32)
+    return y
+
+
+def _causal(coefficients, data, output, axis=-1, backend=None):
+    if output == "sos":
+        return _match_dtype(get_backend(backend)(coefficients, data, axis=axis), data)
+    b, a = coefficients
+    return lfilter(b, a, data, axis=axis)
+
+
+def _zero_phase(coefficients, data, output, axis=-1):
+    if output == "sos":
+        return _match_dtype(sosfiltfilt(coefficients, data, axis=axis), data)
+    b, a = coefficients
+    return filtfilt(b, a, data, axis=axis)
+
+
+def _apply(coefficients, data, output, mode, axis=-1, backend=None):
+    if mode == "causal":
+        return _causal(coefficients, data, output, axis=axis, backend=backend)
+    elif mode == "zero-phase":
+        return _zero_phase(coefficients, data, output, axis=axis)
+    raise ValueError("Filter mode '{}' is not supported.".format(mode))
+
+
+def butter_highpass(cutoff, fs, order=5, output="sos"):
+    # Nyquist frequency | f = f / (fs/2)
+    nyq = 0.5 * fs
+    normal_cutoff = cutoff / nyq
+    return _design(order, normal_cutoff, 'high', output)
+
+
+def butter_highpass_filter(data, cutoff, fs, order=5, output="sos", axis=-1, mode="causal", backend=None):
+    coefficients = butter_highpass(cutoff, fs, order=order, output=output)
+    y = _apply(coefficients, data, output, mode, axis=axis, backend=backend)
+    return y
+
+
+def butter_lowpass(cutoff, fs, order=5, output="sos"):
+    # Nyquist frequency | f = f / (fs/2)
+    nyq = 0.5 * fs
+    normal_cutoff = cutoff / nyq
+    return _design(order, normal_cutoff, 'low', output)
+
+
+def butter_lowpass_filter(data, cutoff, fs, order=5, output="sos", axis=-1, mode="causal", backend=None):
+    coefficients = butter_lowpass(cutoff, fs, order=order, output=output)
+    y = _apply(coefficients, data, output, mode, axis=axis, backend=backend)
+    return y
+
+
+def butter_bandpass(lowcut, highcut, fs, order=5, output="sos"):
+    # Nyquist frequency | f = f / (fs/2)
+    nyq = 0.5 * fs
+    low = lowcut / nyq
+    high = highcut / nyq
+    return _design(order, [low, high], 'band', output)
+
+
+def butter_bandpass_filter(data, lowcut, highcut, fs, order=5, output="sos", axis=-1, mode="causal", backend=None):
+    coefficients = butter_bandpass(lowcut, highcut, fs, order=order, output=output)
+    y = _apply(coefficients, data, output, mode, axis=axis, backend=backend)
+    return y
+
+
+def butter_bandstop(lowcut, highcut, fs, order=5, output="sos"):
+    # Nyquist frequency | f = f / (fs/2)
+    nyq = 0.5 * fs
+    low = lowcut / nyq
+    high = highcut / nyq
+    return _design(order, [low, high], 'bandstop', output)
+
+
+def butter_bandstop_filter(data, lowcut, highcut, fs, order=5, output="sos", axis=-1, mode="causal", backend=None):
+    coefficients = butter_bandstop(lowcut, highcut, fs, order=order, output=output)
+    y = _apply(coefficients, data, output, mode, axis=axis, backend=backend)
+    return y
+
+
+def design_filter(filter_type, order, lowcut, highcut, fs, output="sos"):
+    """Return the coefficients of the chosen filter type.
+
+    Single-cutoff filters follow the GUI convention: lowpass uses `lowcut`,
+    highpass uses `highcut`. With `output="sos"` an (n_sections, 6) array is
+    returned, with `output="ba"` the (b, a) tuple.
+    """
+    if filter_type == "highpass":
+        return butter_highpass(highcut, fs, order=order, output=output)
+    elif filter_type == "lowpass":
+        return butter_lowpass(lowcut, fs, order=order, output=output)
+    elif filter_type == "bandpass":
+        return butter_bandpass(lowcut, highcut, fs, order=order, output=output)
+    elif filter_type == "bandstop":
+        return butter_bandstop(lowcut, highcut, fs, order=order, output=output)
+    raise ValueError("Filter type '{}' is not supported.".format(filter_type))
+
+
+def filter_signal(data, filter_type, order, lowcut, highcut, fs, output="sos", axis=-1, mode="causal",
+                  backend=None):
+    """Filter `data` with the chosen filter type and return the output.
+
+    `data` may be a single signal or an N-D array of signals, e.g.
+    (channels, samples); every signal is filtered along `axis` in one call.
+    `mode` is one of FILTER_MODES and applies to every filter type.
+    `backend` names the kernel of the causal SOS path, see filter.backends.
+    """
+    if filter_type == "highpass":
+        return butter_highpass_filter(data, cutoff=highcut, fs=fs, order=order, output=output, axis=axis, mode=mode, backend=backend)
+    elif filter_type == "lowpass":
+        return butter_lowpass_filter(data, cutoff=lowcut, fs=fs, order=order, output=output, axis=axis, mode=mode, backend=backend)
+    elif filter_type == "bandpass":
+        return butter_bandpass_filter(data, lowcut=lowcut, highcut=highcut, fs=fs, order=order, output=output, axis=axis, mode=mode, backend=backend)
+    elif filter_type == "bandstop":
+        return butter_bandstop_filter(data, lowcut=lowcut, highcut=highcut, fs=fs, order=order, output=output, axis=axis, mode=mode, backend=backend)
+    raise ValueError("Filter type '{}' is not supported.".format(filter_type))
+
+
+def filter_batch(data, parameters, output="sos", axis=-1, mode="causal", backend=None):
+    """Filter `data` with every parameter set and stack the results.
+
+    `parameters` is a sequence of dicts with the `filter_signal` keywords
+    (filter_type, order, lowcut, highcut, fs), e.g. a sweep of cutoffs.
+    The result has shape (len(parameters),) + data.shape. Each design is
+    applied to all channels of `data` in a single vectorized call.
+    """
+    data = np.asarray(data, dtype=float)
+    result = np.empty((len(parameters),) + data.shape)
+    for i, params in enumerate(parameters):
+        result[i] = filter_signal(data, output=output, axis=axis, mode=mode, backend=backend, **params)
+    return result
+
+
+def decay_length(sos, tol=DECAY_TOLERANCE):
+    """Return after how many samples the impulse response fell below `tol`.
+
+    Estimated from the largest pole radius r of the sections: r**n < tol.
+    """
+    radius = max(np.max(np.abs(np.roots(section[3:]))) for section in np.atleast_2d(sos))
+    if radius >= 1.0:
+        raise ValueError("Filter is unstable, pole radius {:.6f}.".format(radius))
+    if radius == 0.0:
+        return 1
+    return int(np.ceil(np.log(tol) / np.log(radius)))
+
+
+def zero_phase_padlen(sos):
+    """Return the padding `iter_zero_phase` uses around every block.
+
+    `decay_length(sos)`, but at least the edge padding of `sosfiltfilt`
+    so that no padded block is too short to be filtered.
+    """
+    return max(decay_length(sos), 3 * (2 * np.atleast_2d(sos).shape[0] + 1))
+
+
+def iter_zero_phase(sos, data, blocksize, padlen=None, axis=-1):
+    """Zero-phase filter `data` in overlapping blocks, yielding the output.
+
+    Every block is extended by `padlen` samples on both sides, filtered
+    forward and backward with `sosfiltfilt` and trimmed back. Errors from
+    the cuts decay within the padding (by default `zero_phase_padlen(sos)`),
+    so the concatenated blocks match one-shot `sosfiltfilt` to floating-point
+    tolerance while only one padded block is in memory at a time; `data`
+    may be a memory-mapped file. Blocks are yielded along `axis`.
+
+    `blocksize` is raised to ZERO_PHASE_BLOCK_PADDINGS times `padlen`, so
+    narrowband designs with long impulse responses yield larger blocks.
+    """
+    if isinstance(sos, tuple):
+        raise ValueError("Chunked zero-phase filtering needs 'sos' coefficients.")
+    if padlen is None:
+        padlen = zero_phase_padlen(sos)
+    blocksize = max(blocksize, ZERO_PHASE_BLOCK_PADDINGS * padlen)
+    samples = data.shape[axis]
+    index = [slice(None)] * data.ndim
+    for start in range(0, samples, blocksize):
+        stop = min(start + blocksize, samples)
+        first = max(start - padlen, 0)
+        last = min(stop + padlen, samples)
+        index[axis] = slice(first, last)
+        segment = data[tuple(index)]
+        y = _match_dtype(sosfiltfilt(sos, segment, axis=axis), segment)
+        index[axis] = slice(start - first, stop - first)
+        yield y[tuple(index)]
+
+
+def zero_phase_chunked(sos, data, blocksize, padlen=None, axis=-1, out=None):
+    """Zero-phase filter `data` block by block into `out` and return it.
+
+    See `iter_zero_phase`; `out` may be a preallocated (memory-mapped)
+    array of the same shape as `data`.
+    """
+    if out is None:
+        out = np.empty(data.shape)
+    view = np.moveaxis(out, axis, 0)
+    start = 0
+    for block in iter_zero_phase(sos, data, blocksize, padlen=padlen, axis=axis):
+        block = np.moveaxis(block, axis, 0)
+        view[start:start + block.shape[0]] = block
+        start += block.shape[0]
+    return out
+
+
+class StreamingFilter:
+    """Causal filter which carries its state across consecutive chunks.
+
+    Feeding a signal chunk by chunk through `process` gives the same output
+    (to floating-point tolerance) as filtering the whole signal at once
+    with the same initial state, so there are no transients at the chunk
+    boundaries and memory use does not depend on the signal length.
+
+    Parameters
+    ----------
+    `filter_type`, `order`, `lowcut`, `highcut`, `fs`, `output`
+        Filter design, see `design_filter`.
+    `initial` : str
+        "steady" starts from the steady-state response to the first sample
+        (`sosfilt_zi`/`lfilter_zi`), "zero" from rest, which matches the
+        one-shot `butter_*_filter` causal output.
+    `axis` : int
+        Time axis of the chunks; multichannel chunks are filtered along it.
+    `backend` : str, optional
+        Kernel of the SOS path, see filter.backends.
+    """
+
+    INITIAL_STATES = ("steady", "zero")
+
+    def __init__(self, filter_type, order, lowcut, highcut, fs, output="sos", initial="steady", axis=-1,
+                 backend=None):
+        if initial not in self.INITIAL_STATES:
+            raise ValueError("Initial state '{}' is not supported.".format(initial))
+        self.output = output
+        self.initial = initial
+        self.axis = axis
+        self.kernel = get_backend(backend)
+        self.coefficients = design_filter(filter_type, order, lowcut, highcut, fs, output=output)
+        self.zi = None
+
+    def reset(self):
+        """Forget the filter state; the next chunk starts a new signal."""
+        self.zi = None
+
+    def _initial_state(self, chunk):
+        axis = self.axis % chunk.ndim
+        # first sample of every channel, kept as a length 1 time axis
+        first = np.take(chunk, [0], axis=axis)
+        shape = [1] * chunk.ndim
+        if self.output == "sos":
+            zi = sosfilt_zi(self.coefficients)
+            shape[axis] = 2
+            zi = zi.reshape([zi.shape[0]] + shape) * first[np.newaxis]
+        else:
+            zi = lfilter_zi(*self.coefficients)
+            shape[axis] = zi.size
+            zi = zi.reshape(shape) * first
+        if self.initial == "steady":
+            return zi
+        return np.zeros_like(zi)
+
+    def process(self, chunk):
+        """Filter the next chunk of the signal and return the output."""
+        chunk = np.asarray(chunk, dtype=float)
+        if chunk.shape[self.axis] == 0:
+            return chunk.copy()
+        if self.zi is None:
+            self.zi = self._initial_state(chunk)
+        if self.output == "sos":
+            y, self.zi = self.kernel(self.coefficients, chunk, axis=self.axis, zi=self.zi)
+        else:
+            b, a = self.coefficients
+            y, self.zi = lfilter(b, a, chunk, axis=self.axis, zi=self.zi)
+        return y
+
+    def stream(self, chunks):
+        """Generator stage: yield the filtered version of every chunk."""
+        for chunk in chunks:
+            yield self.process(chunk)
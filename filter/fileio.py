@@ -0,0 +1,207 @@
+"""Block-wise reading and writing of signal files.
+
+Every reader yields (frames, channels) float blocks, so files larger than
+memory can be streamed through a StreamingFilter. Supported formats are
+raw binary, WAV, NPY and CSV. Integer PCM WAV samples are scaled to
+[-1, 1), matching the float WAV files written by BlockWriter.
+"""
+import itertools
+import os
+import struct
+
+import numpy as np
+from scipy.io import wavfile
+
+
+FILE_FORMATS = ("raw", "wav", "npy", "csv")
+# formats which can be memory-mapped for reading and writing
+MEMMAP_FORMATS = ("raw", "npy")
+
+# samples per channel handed to the filter at once
+BLOCK_SIZE = 65536
+
+
+def detect_format(path):
+    """Guess the file format from the extension, unknown ones are raw."""
+    extension = os.path.splitext(path)[1].lower().lstrip(".")
+    if extension in ("wav", "npy", "csv"):
+        return extension
+    return "raw"
+
+
+def _as_frames(block):
+    # (frames,) -> (frames, 1)
+    block = np.asarray(block)
+    if block.ndim == 1:
+        return block[:, np.newaxis]
+    return block
+
+
+def pcm_to_float(block):
+    """Scale integer PCM samples to [-1, 1) floats, floats pass through."""
+    block = np.asarray(block)
+    if block.dtype == np.uint8:
+        # 8-bit WAV is unsigned, centered at 128
+        return (block.astype(np.float64) - 128.0) / 128.0
+    if np.issubdtype(block.dtype, np.integer):
+        return block.astype(np.float64) / -float(np.iinfo(block.dtype).min)
+    return block
+
+
+def read_blocks(path, fmt=None, blocksize=BLOCK_SIZE, dtype="float64", channels=1):
+    """Yield (frames, channels) blocks of the signal stored in `path`.
+
+    `dtype` and `channels` describe the layout of raw files (interleaved
+    samples); the other formats carry it in their header.
+    """
+    fmt = fmt or detect_format(path)
+    if fmt == "raw":
+        dtype = np.dtype(dtype)
+        with open(path, "rb") as f:
+            while True:
+                block = np.fromfile(f, dtype=dtype, count=blocksize * channels)
+                if block.size == 0:
+                    return
+                yield block.reshape(-1, channels)
+    elif fmt == "npy":
+        data = _as_frames(np.load(path, mmap_mode="r"))
+        for start in range(0, data.shape[0], blocksize):
+            yield data[start:start + blocksize]
+    elif fmt == "wav":
+        _, data = wavfile.read(path, mmap=True)
+        data = _as_frames(data)
+        for start in range(0, data.shape[0], blocksize):
+            yield pcm_to_float(data[start:start + blocksize])
+    elif fmt == "csv":
+        with open(path) as f:
+            lines = (line for line in f if line.strip())
+            while True:
+                chunk = list(itertools.islice(lines, blocksize))
+                if not chunk:
+                    return
+                yield np.loadtxt(chunk, delimiter=",", ndmin=2)
+    else:
+        raise ValueError("File format '{}' is not supported.".format(fmt))
+
+
+def open_recording(path, fmt=None, dtype="float64", channels=1):
+    """Memory-map a raw, NPY or WAV recording read-only, without loading it.
+
+    Returns the mapped array; raw files are viewed as (frames, channels).
+    Slicing it gives views, so blocks are paged in only when filtered.
+    WAV samples are returned as stored, see `pcm_to_float`.
+    """
+    fmt = fmt or detect_format(path)
+    if fmt == "raw":
+        return np.memmap(path, dtype=np.dtype(dtype), mode="r").reshape(-1, channels)
+    elif fmt == "npy":
+        return np.load(path, mmap_mode="r")
+    elif fmt == "wav":
+        _, data = wavfile.read(path, mmap=True)
+        return data
+    raise ValueError("File format '{}' can't be memory-mapped.".format(fmt))
+
+
+def create_output(path, shape, fmt=None, dtype="float64"):
+    """Preallocate a writable memory-mapped raw or NPY file of `shape`."""
+    fmt = fmt or detect_format(path)
+    if fmt == "raw":
+        return np.memmap(path, dtype=np.dtype(dtype), mode="w+", shape=shape)
+    elif fmt == "npy":
+        return np.lib.format.open_memmap(path, mode="w+", dtype=np.dtype(dtype), shape=shape)
+    raise ValueError("File format '{}' can't be memory-mapped.".format(fmt))
+
+
+def filter_mapped(src, dst, streaming_filter, blocksize=BLOCK_SIZE, flush_every=64):
+    """Filter mapped array `src` into the preallocated mapped array `dst`.
+
+    The time axis is the first one. Every block is a view of `src` and the
+    output is assigned straight into `dst`, so resident memory stays at a
+    few blocks no matter how large the files are. Written pages are
+    flushed every `flush_every` blocks so the OS can drop them.
+    """
+    src = _as_frames(src)
+    dst = _as_frames(dst)
+    for i, start in enumerate(range(0, src.shape[0], blocksize)):
+        stop = start + blocksize
+        dst[start:stop] = streaming_filter.process(src[start:stop])
+        if (i + 1) % flush_every == 0 and hasattr(dst, "flush"):
+            dst.flush()
+    if hasattr(dst, "flush"):
+        dst.flush()
+    return dst
+
+
+def wav_rate(path):
+    """Return the sample rate stored in a WAV header."""
+    rate, _ = wavfile.read(path, mmap=True)
+    return rate
+
+
+class BlockWriter:
+    """Append (frames, channels) blocks to a signal file.
+
+    Raw and NPY files get interleaved samples of `dtype`, WAV files 32-bit
+    float samples at rate `fs`. Blocks go straight to disk; the WAV and NPY
+    headers are written on `close`, once the length is known. Use as a
+    context manager or call `close`.
+    """
+
+    # bytes reserved in front of the samples
+    HEADER_SIZE = {"wav": 44, "npy": 128}
+
+    def __init__(self, path, fmt=None, fs=None, dtype="float64"):
+        self.path = path
+        self.fmt = fmt or detect_format(path)
+        if self.fmt not in FILE_FORMATS:
+            raise ValueError("File format '{}' is not supported.".format(self.fmt))
+        self.fs = fs
+        self.dtype = np.dtype("float32") if self.fmt == "wav" else np.dtype(dtype)
+        self.frames = 0
+        self.channels = None
+        self.file = open(path, "w" if self.fmt == "csv" else "wb")
+        if self.fmt in ("wav", "npy"):
+            # header is rewritten with the final sizes on close
+            self.file.write(b"\0" * self.HEADER_SIZE[self.fmt])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, block):
+        block = _as_frames(block)
+        self.channels = block.shape[1]
+        self.frames += block.shape[0]
+        if self.fmt == "csv":
+            np.savetxt(self.file, block, delimiter=",")
+        else:
+            block.astype(self.dtype).tofile(self.file)
+
+    def close(self):
+        if self.file.closed:
+            return
+        if self.fmt == "npy":
+            self._write_npy_header()
+        elif self.fmt == "wav":
+            self._write_wav_header()
+        self.file.close()
+
+    def _write_npy_header(self):
+        channels = self.channels or 1
+        shape = (self.frames,) if channels == 1 else (self.frames, channels)
+        header = "{{'descr': '{}', 'fortran_order': False, 'shape': {}, }}".format(self.dtype.str, shape)
+        # NPY 1.0: magic, version, header length, header padded with spaces
+        size = self.HEADER_SIZE["npy"] - 10
+        self.file.seek(0)
+        self.file.write(b"\x93NUMPY\x01\x00" + struct.pack("<H", size) + header.ljust(size - 1).encode("latin1") + b"\n")
+
+    def _write_wav_header(self):
+        channels = self.channels or 1
+        rate = int(round(self.fs or 1))
+        size = self.frames * channels * 4
+        self.file.seek(0)
+        # RIFF header of IEEE float (format 3) 32-bit samples
+        self.file.write(struct.pack("<4sI4s4sIHHIIHH4sI", b"RIFF", 36 + size, b"WAVE", b"fmt ", 16, 3,
+                                    channels, rate, rate * channels * 4, channels * 4, 32, b"data", size))
@@ -0,0 +1,228 @@
+"""Live input: producers, a fixed-size ring buffer and the filter pipeline.
+
+A producer thread pushes (timestamp, block) pairs into a bounded queue;
+when the consumer falls behind, new blocks are dropped and counted instead
+of growing the queue. `LivePipeline.poll` drains the queue, filters every
+block with a StreamingFilter and appends input and output to ring buffers
+holding the last few seconds for drawing.
+"""
+import queue
+import socket
+import threading
+import time
+
+import numpy as np
+
+from filter.engine import StreamingFilter
+from filter.signals import synthesize
+
+
+# seconds of signal kept for drawing
+LIVE_WINDOW = 5.0
+# samples per block read from a stream
+LIVE_BLOCK = 1024
+# seconds of signal per synthesized block
+LIVE_PERIOD = 0.02
+# blocks waiting for the consumer before new ones are dropped
+LIVE_QUEUE = 64
+
+
+def block_size(fs, period=LIVE_PERIOD):
+    """Return the samples per block for one block every `period` sec."""
+    return max(1, int(round(fs * period)))
+
+
+class RingBuffer:
+    """Fixed-size circular buffer of the most recent samples."""
+
+    def __init__(self, capacity, dtype=np.float64):
+        self.data = np.zeros(capacity, dtype=dtype)
+        self.head = 0    # index of the next write
+        self.count = 0   # samples written in total
+
+    @property
+    def capacity(self):
+        return self.data.size
+
+    def extend(self, block):
+        """Append `block`; only its last `capacity` samples are kept."""
+        block = np.asarray(block)[-self.capacity:]
+        n = block.size
+        end = self.head + n
+        if end <= self.capacity:
+            self.data[self.head:end] = block
+        else:
+            split = self.capacity - self.head
+            self.data[self.head:] = block[:split]
+            self.data[:n - split] = block[split:]
+        self.head = end % self.capacity
+        self.count += n
+
+    def snapshot(self):
+        """Return the stored samples, oldest first, as a new array."""
+        if self.count < self.capacity:
+            return self.data[:self.head].copy()
+        return np.concatenate((self.data[self.head:], self.data[:self.head]))
+
+
+class Producer(threading.Thread):
+    """Base of the threads feeding blocks into a LivePipeline queue."""
+
+    def __init__(self, blocks, blocksize=LIVE_BLOCK):
+        super().__init__(daemon=True)
+        self.blocks = blocks
+        self.blocksize = blocksize
+        self.dropped = 0
+        self._stopped = threading.Event()
+
+    def stop(self):
+        self._stopped.set()
+
+    def stopped(self):
+        return self._stopped.is_set()
+
+    def push(self, block):
+        try:
+            self.blocks.put_nowait((time.perf_counter(), block))
+        except queue.Full:
+            self.dropped += 1
+
+
+class SynthProducer(Producer):
+    """Runs the synthesizer in real time, one block every blocksize / fs."""
+
+    def __init__(self, blocks, components, fs, blocksize=None):
+        super().__init__(blocks, block_size(fs) if blocksize is None else blocksize)
+        self.components = list(components)
+        self.fs = fs
+        # one noise stream for all blocks
+        self.rng = np.random.default_rng()
+
+    def run(self):
+        period = self.blocksize / self.fs
+        offset = 0
+        deadline = time.perf_counter()
+        while not self.stopped():
+            block = synthesize(self.components, period, self.fs, seed=self.rng, offset=offset).data
+            offset += block.size
+            self.push(block)
+            deadline += period
+            delay = deadline - time.perf_counter()
+            if delay > 0:
+                self._stopped.wait(delay)
+
+
+class StreamProducer(Producer):
+    """Reads little-endian float32 samples from a socket or a pipe.
+
+    `source` is "host:port" for a TCP connection, otherwise a path of a
+    named pipe or file.
+    """
+
+    SAMPLE = np.dtype("<f4")
+
+    def __init__(self, blocks, source, blocksize=LIVE_BLOCK):
+        super().__init__(blocks, blocksize)
+        self.source = source
+        self.error = None
+
+    def open(self):
+        host, _, port = self.source.rpartition(":")
+        if host and port.isdigit():
+            return socket.create_connection((host, int(port))).makefile("rb")
+        return open(self.source, "rb", buffering=0)
+
+    def run(self):
+        nbytes = self.blocksize * self.SAMPLE.itemsize
+        try:
+            with self.open() as stream:
+                pending = b""
+                while not self.stopped():
+                    data = stream.read(nbytes - len(pending))
+                    if not data:
+                        break
+                    pending += data
+                    if len(pending) == nbytes:
+                        self.push(np.frombuffer(pending, dtype=self.SAMPLE).astype(np.float64))
+                        pending = b""
+        except OSError as e:
+            self.error = str(e)
+
+
+class LivePipeline:
+    """Filters live blocks and keeps the last `window` seconds for drawing.
+
+    Counters: blocks `processed`, blocks `dropped` by the producer, and the
+    latency [ms] from a block being produced to `poll` handing it out.
+    """
+
+    def __init__(self, filter_type, order, lowcut, highcut, fs, mode="causal", window=LIVE_WINDOW,
+                 queue_size=LIVE_QUEUE):
+        if mode != "causal":
+            raise ValueError("Live filtering is causal only.")
+        self.fs = fs
+        self.blocks = queue.Queue(maxsize=queue_size)
+        self.filter = StreamingFilter(filter_type, order, lowcut, highcut, fs)
+        capacity = max(int(window * fs), 1)
+        self.input = RingBuffer(capacity)
+        self.output = RingBuffer(capacity)
+        self.producer = None
+        self.started = None
+        self.samples = 0
+        self.processed = 0
+        self.latency = 0.0
+        self.max_latency = 0.0
+
+    def start(self, producer):
+        """Start `producer`, created with this pipeline's `blocks` queue."""
+        self.producer = producer
+        self.started = time.perf_counter()
+        producer.start()
+
+    def stop(self):
+        if self.producer is not None:
+            self.producer.stop()
+            self.producer.join(timeout=1.0)
+
+    @property
+    def dropped(self):
+        return self.producer.dropped if self.producer is not None else 0
+
+    def poll(self):
+        """Process every queued block, return the number of new samples."""
+        samples = 0
+        while True:
+            try:
+                produced, block = self.blocks.get_nowait()
+            except queue.Empty:
+                break
+            self.input.extend(block)
+            self.output.extend(self.filter.process(block))
+            samples += block.size
+            self.samples += block.size
+            self.processed += 1
+            self.latency = (time.perf_counter() - produced) * 1e3
+            self.max_latency = max(self.max_latency, self.latency)
+        return samples
+
+    def throughput(self):
+        """Return the processed samples per second since the start."""
+        if self.started is None:
+            return 0.0
+        elapsed = time.perf_counter() - self.started
+        return self.samples / elapsed if elapsed > 0 else 0.0
+
+    def summary(self):
+        """Return e.g. "latency 1.2 ms (max 3.4 ms) | 0 dropped | 30 samples/s"."""
+        return "latency {:.1f} ms (max {:.1f} ms) | {} dropped | {:.0f} samples/s".format(
+            self.latency, self.max_latency, self.dropped, self.throughput())
+
+    def window(self):
+        """Return (time, input, output) of the buffered samples.
+
+        Time is relative to the newest sample, so it runs up to 0 sec.
+        """
+        x = self.input.snapshot()
+        y = self.output.snapshot()
+        t = np.arange(-x.size, 0) / self.fs
+        return t, x, y
@@ -0,0 +1,32 @@
+"""Level-of-detail reduction of long signals for drawing.
+
+A line drawn over N pixels never needs more than two points per pixel: the
+minimum and the maximum of the samples falling into that pixel column.
+"""
+import numpy as np
+
+
+def minmax_envelope(t, y, xmin, xmax, pixels):
+    """Return (t, y) reduced to per-pixel min/max pairs in [xmin, xmax].
+
+    `t` must be sorted. One sample on each side of the visible range is
+    kept, so the line runs to the edges of the axes. When the visible part
+    has no more than two samples per pixel it is returned unchanged.
+    """
+    start = max(np.searchsorted(t, xmin, side="left") - 1, 0)
+    stop = min(np.searchsorted(t, xmax, side="right") + 1, len(t))
+    pixels = max(int(pixels), 1)
+    if stop - start <= 2 * pixels:
+        return t[start:stop], y[start:stop]
+
+    visible = y[start:stop]
+    edges = np.unique(np.linspace(0, stop - start, pixels, endpoint=False).astype(np.intp))
+    lows = np.minimum.reduceat(visible, edges)
+    highs = np.maximum.reduceat(visible, edges)
+
+    # every pixel column becomes a vertical segment from its min to its max
+    tx = np.repeat(t[start + edges], 2)
+    yx = np.empty(2 * edges.size, dtype=y.dtype)
+    yx[0::2] = lows
+    yx[1::2] = highs
+    return tx, yx
@@ -1,7 +1,22 @@
+import logging
 import sys
+
+import numpy as np
 from PyQt5 import QtWidgets, QtCore, QtGui
+from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT
+
+from filter.engine import FILTER_MODES, FILTER_ORDERS, FILTER_TYPES
+from filter.live import LIVE_WINDOW, LivePipeline, StreamProducer, SynthProducer, block_size
+from filter.plots import UnfilteredSignalPlot, FilteredSignalPlot, SpectrumPlot
+from filter.profiling import StageTimer
+from filter.session import load_session, save_session
+from filter.signals import Sine
+from filter.spectrum import SpectrumCache, frequency_response, magnitude_spectrum
+from filter.sweepdialog import SweepDialog
+from filter.worker import PlotParameters, PlotResult, PlotWorker
+
 
-from filter.plots import UnfilteredSignalPlot, FilteredSignalPlot
+logger = logging.getLogger(__name__)
 
 
 def inputValidator(text):
@@ -14,9 +29,19 @@ def inputValidator(text):
 
 class MainApplication(QtWidgets.QMainWindow):
 
+    # emitted with the StageTimer of every drawn plot
+    timingsReady = QtCore.pyqtSignal(object)
+
     # filter parameters
-    FILTER_TYPES = ["lowpass", "highpass", "bandpass", "bandstop"]
-    FILTER_ORDERS = ["1", "2", "4", "8", "10", "16"]
+    FILTER_TYPES = list(FILTER_TYPES)
+    FILTER_ORDERS = [str(order) for order in FILTER_ORDERS]
+    FILTER_MODES = list(FILTER_MODES)
+
+    # file dialog filters of the session formats
+    SESSION_FILTERS = "NumPy session (*.npz);;NumPy session, float32 (*.npz);;HDF5 session (*.h5 *.hdf5)"
+
+    # live plots refresh period [ms], about 30 frames per second
+    LIVE_INTERVAL = 33
 
     INFO = (
         "Student Project with:\n"
@@ -32,9 +57,28 @@ class MainApplication(QtWidgets.QMainWindow):
         self.top = 50
         self.left = 50
         self.width = 1200
-        self.height = 700
+        self.height = 900
         self.title = "Simple Butterworth Filter"
         self.iconName = "icons//logo_uksw.ico"
+        # background computation, only the newest job is drawn
+        self.threadPool = QtCore.QThreadPool()
+        self.jobId = 0
+        self.currentJob = None
+        self.spectrumCache = SpectrumCache()
+        # last drawn signals and the parameters they were computed with
+        self.lastResult = None
+        self.lastParameters = None
+        # per-stage timings of the last plot, cProfile output path if enabled
+        self.lastTimings = None
+        self.profilePath = None
+        # live mode: running pipeline, stream source (None synthesizes the
+        # input) and the y-ranges of the scrolling plots
+        self.livePipeline = None
+        self.liveSource = None
+        self.liveLimits = {}
+        self.liveTimer = QtCore.QTimer(self)
+        self.liveTimer.setInterval(self.LIVE_INTERVAL)
+        self.liveTimer.timeout.connect(self.updateLive)
         # setup UI
         self.initUI()
         self.createWidgets()
@@ -58,6 +102,8 @@ class MainApplication(QtWidgets.QMainWindow):
         self.inputPlotCanvas = UnfilteredSignalPlot(self)
         # create output filtered signal
         self.outputPlotCanvas = FilteredSignalPlot(self)
+        # create spectrum and filter response plot
+        self.spectrumPlotCanvas = SpectrumPlot(self)
         # create the status bar
         self.addStatusBar()
 
@@ -68,21 +114,48 @@ class MainApplication(QtWidgets.QMainWindow):
 
         # create Root Menus
         fileMenu = menuBar.addMenu("&File")
+        toolsMenu = menuBar.addMenu("&Tools")
         helpMenu = menuBar.addMenu("&Help")
 
+        exportAction = QtWidgets.QAction("&Export Session...", self)
+        exportAction.setShortcut("Ctrl+S")
+        openAction = QtWidgets.QAction("&Open Session...", self)
+        openAction.setShortcut("Ctrl+O")
         quitAction = QtWidgets.QAction('&Quit', self)
         quitAction.setShortcut("Ctrl+Q")
 
+        sweepAction = QtWidgets.QAction("Parameter &Sweep...", self)
+        self.profileAction = QtWidgets.QAction("&Profile Plots...", self)
+        self.profileAction.setCheckable(True)
+        self.liveAction = QtWidgets.QAction("&Live Mode", self)
+        self.liveAction.setShortcut("Ctrl+L")
+        self.liveAction.setCheckable(True)
+        liveSourceAction = QtWidgets.QAction("Live S&ource...", self)
+
         aboutAction = QtWidgets.QAction("&About", self)
         versionAction = QtWidgets.QAction("&Version", self)
 
         # add actions to Menus
+        fileMenu.addAction(openAction)
+        fileMenu.addAction(exportAction)
+        fileMenu.addSeparator()
         fileMenu.addAction(quitAction)
+        toolsMenu.addAction(sweepAction)
+        toolsMenu.addAction(self.profileAction)
+        toolsMenu.addSeparator()
+        toolsMenu.addAction(self.liveAction)
+        toolsMenu.addAction(liveSourceAction)
         helpMenu.addAction(aboutAction)
         helpMenu.addAction(versionAction)
 
         # events
+        exportAction.triggered.connect(self.exportSession)
+        openAction.triggered.connect(self.openSession)
         quitAction.triggered.connect(self.closeApplication)
+        sweepAction.triggered.connect(self.showSweep)
+        self.profileAction.toggled.connect(self.toggleProfiling)
+        self.liveAction.toggled.connect(self.toggleLive)
+        liveSourceAction.triggered.connect(self.chooseLiveSource)
         aboutAction.triggered.connect(self.showAbout)
         versionAction.triggered.connect(self.showVersion)
 
@@ -115,6 +188,15 @@ class MainApplication(QtWidgets.QMainWindow):
         self.filterOrderCombo = QtWidgets.QComboBox()
         self.filterOrderCombo.addItems(self.FILTER_ORDERS)
 
+        self.filterModeLabel = QtWidgets.QLabel("Phase")
+        self.filterModeCombo = QtWidgets.QComboBox()
+        self.filterModeCombo.addItems(self.FILTER_MODES)
+
+        self.multirateCheckBox = QtWidgets.QCheckBox("Multirate")
+        self.multirateCheckBox.setToolTip("Decimate narrowband lowpass and bandpass signals,\n"
+                                          "filter at the reduced rate and interpolate back\n"
+                                          "where that is estimated to be faster")
+
         self.cutoffLabel = QtWidgets.QLabel("Cuttof Frequency")
 
         self.passbandLineEdit = QtWidgets.QLineEdit()
@@ -166,6 +248,8 @@ class MainApplication(QtWidgets.QMainWindow):
         self.filterOrderCombo.setCurrentIndex(0)
         # Default is ‘lowpass’.
         self.filterTypeCombo.setCurrentIndex(0)
+        # Default is ‘causal’.
+        self.filterModeCombo.setCurrentIndex(0)
         self.passbandLineEdit.setDisabled(True)
         self.stopbandLineEdit.setDisabled(False)
 
@@ -182,6 +266,82 @@ class MainApplication(QtWidgets.QMainWindow):
         """Close the application."""
         QtWidgets.qApp.quit()
 
+    def exportSession(self):
+        """Save the plotted signals, coefficients and parameters."""
+        if self.lastResult is None:
+            self.showError("Export error", "Please plot a signal before exporting.")
+            return
+        path, selectedFilter = QtWidgets.QFileDialog.getSaveFileName(self, "Export Session", "session.npz",
+                                                                     self.SESSION_FILTERS)
+        if not path:
+            return
+        p = self.lastParameters
+        result = self.lastResult
+        design = dict(filter_type=p.filterType, order=p.filterOrder, lowcut=p.lowcut, highcut=p.highcut,
+                      fs=p.sampleFrequency)
+        dtype = np.float32 if "float32" in selectedFilter else np.float64
+        try:
+            save_session(path, result.time, result.unfiltered, result.filtered, design, p._asdict(), dtype=dtype)
+        except (ImportError, OSError, ValueError) as e:
+            self.showError("Export error", "Session couldn't be saved.", str(e))
+            return
+        self.status.setText("Session saved to {}".format(path))
+
+    def openSession(self):
+        """Draw a saved session without recomputing it."""
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Open Session", "", self.SESSION_FILTERS)
+        if not path:
+            return
+        try:
+            with load_session(path) as session:
+                p = PlotParameters(**session.parameters)
+                t, unfiltered, filtered = session.time, session.unfiltered, session.filtered
+        except (ImportError, OSError, KeyError, TypeError, ValueError) as e:
+            self.showError("Open error", "Session couldn't be opened.", str(e))
+            return
+        self.cancelJob()
+        self.liveAction.setChecked(False)
+        self.setParameters(p)
+        result = PlotResult(t, unfiltered, filtered, p.duration,
+                            magnitude_spectrum(unfiltered, p.sampleFrequency),
+                            magnitude_spectrum(filtered, p.sampleFrequency),
+                            frequency_response(p.filterType, p.filterOrder, p.lowcut, p.highcut, p.sampleFrequency,
+                                               mode=p.filterMode),
+                            StageTimer())
+        self.inputPlotCanvas.drawSignal(result.time, result.unfiltered, result.duration)
+        self.outputPlotCanvas.drawSignal(result.time, result.filtered, result.duration)
+        self.spectrumPlotCanvas.drawSpectrum(result.inputSpectrum, result.outputSpectrum, result.response,
+                                             p.sampleFrequency)
+        self.lastResult = result
+        self.lastParameters = p
+        self.status.setText("Session loaded from {}".format(path))
+
+    def setParameters(self, p):
+        """Fill the inputs with PlotParameters `p`."""
+        self.firstAmplitudeLineEdit.setText("{:g}".format(p.firstAmplitude))
+        self.firstFrequencyLineEdit.setText("{:g}".format(p.firstFrequency))
+        self.secondAmplitudeLineEdit.setText("{:g}".format(p.secondAmplitude))
+        self.secondFrequencyLineEdit.setText("{:g}".format(p.secondFrequency))
+        self.durationLineEdit.setText(str(p.duration))
+        self.sampleFrequencyLineEdit.setText(str(p.sampleFrequency))
+        self.filterTypeCombo.setCurrentText(p.filterType)
+        self.filterOrderCombo.setCurrentText(str(p.filterOrder))
+        self.filterModeCombo.setCurrentText(p.filterMode)
+        self.multirateCheckBox.setChecked(p.multirate)
+        self.stopbandLineEdit.setText("{:g}".format(p.lowcut))
+        self.passbandLineEdit.setText("{:g}".format(p.highcut))
+
+    def showError(self, title, text, details=None):
+        """Show a critical message box, `details` as its informative text."""
+        errorMessage = QtWidgets.QMessageBox()
+        errorMessage.setIcon(QtWidgets.QMessageBox.Critical)
+        errorMessage.setWindowIcon(QtGui.QIcon(self.iconName))
+        errorMessage.setWindowTitle(title)
+        errorMessage.setText(text)
+        if details is not None:
+            errorMessage.setInformativeText(details)
+        errorMessage.exec_()
+
     def showAbout(self):
         """Show information about project and author."""
         aboutMessage = QtWidgets.QMessageBox()
@@ -199,6 +359,111 @@ class MainApplication(QtWidgets.QMainWindow):
         versionMessage.setIcon(QtWidgets.QMessageBox.Information)
         versionMessage.exec_()
 
+    # ======== Tools Menu function ========
+    def showSweep(self):
+        """Open the parameter sweep of the plotted signal."""
+        if self.lastResult is None:
+            self.showError("Sweep error", "Please plot a signal before sweeping.")
+            return
+        p = self.lastParameters
+        dialog = SweepDialog(self, self.lastResult.unfiltered, p.sampleFrequency, p.filterType, p.filterMode,
+                             p.lowcut, p.highcut)
+        dialog.setWindowIcon(QtGui.QIcon(self.iconName))
+        dialog.resize(700, 500)
+        dialog.exec_()
+
+    def toggleProfiling(self, checked):
+        """Profile every following plot with cProfile and export its trace."""
+        if checked:
+            path, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Save profile", "simple_filter.prof",
+                                                            "Profile (*.prof)")
+            if not path:
+                self.profileAction.setChecked(False)
+                return
+            self.profilePath = path
+        else:
+            self.profilePath = None
+
+    def chooseLiveSource(self):
+        """Ask for a "host:port" or pipe path streaming float32 samples."""
+        source, ok = QtWidgets.QInputDialog.getText(
+            self, "Live Source", "TCP host:port or pipe path of float32 samples,\nempty to synthesize the input:",
+            text=self.liveSource or "")
+        if ok:
+            self.liveSource = source.strip() or None
+
+    def toggleLive(self, checked):
+        """Stream the input through the filter and scroll both plots."""
+        if checked:
+            self.startLive()
+        else:
+            self.stopLive()
+
+    def startLive(self):
+        sampleFrequency = int(inputValidator(self.sampleFrequencyLineEdit.text()))
+        filterType = self.filterTypeCombo.currentText()
+        filterOrder = int(self.filterOrderCombo.currentText())
+        passband = inputValidator(self.passbandLineEdit.text())
+        stopband = inputValidator(self.stopbandLineEdit.text())
+        try:
+            if sampleFrequency == 0:
+                raise ValueError("Sample frequency is not set.")
+            # zero-phase needs the future of the signal, live filtering is causal
+            pipeline = LivePipeline(filterType, filterOrder, stopband, passband, sampleFrequency)
+        except ValueError as e:
+            self.liveAction.setChecked(False)
+            self.showError("Live error", "Live mode couldn't start. Please change the parameters.", str(e))
+            return
+        if self.liveSource is None:
+            components = [Sine(inputValidator(self.firstAmplitudeLineEdit.text()),
+                               inputValidator(self.firstFrequencyLineEdit.text())),
+                          Sine(inputValidator(self.secondAmplitudeLineEdit.text()),
+                               inputValidator(self.secondFrequencyLineEdit.text()))]
+            producer = SynthProducer(pipeline.blocks, components, sampleFrequency)
+        else:
+            producer = StreamProducer(pipeline.blocks, self.liveSource, block_size(sampleFrequency))
+        self.cancelJob()
+        self.plotButton.setDisabled(True)
+        self.liveLimits = {}
+        self.livePipeline = pipeline
+        pipeline.start(producer)
+        self.liveTimer.start()
+
+    def stopLive(self):
+        self.liveTimer.stop()
+        if self.livePipeline is not None:
+            self.livePipeline.stop()
+            self.livePipeline = None
+        self.plotButton.setDisabled(False)
+        self.status.setText("Ready")
+
+    def updateLive(self):
+        """Filter the queued blocks and redraw the last LIVE_WINDOW seconds."""
+        pipeline = self.livePipeline
+        pipeline.poll()
+        error = getattr(pipeline.producer, "error", None)
+        if error is not None:
+            self.liveAction.setChecked(False)
+            self.status.setText("Live source error: {}".format(error))
+            return
+        t, x, y = pipeline.window()
+        if t.size:
+            # the x-range stays put and the y-range only grows, so redraws blit
+            xlim = (-LIVE_WINDOW, 0)
+            self.inputPlotCanvas.drawSignal(t, x, LIVE_WINDOW, xlim, self.liveRange(self.inputPlotCanvas, x))
+            self.outputPlotCanvas.drawSignal(t, y, LIVE_WINDOW, xlim, self.liveRange(self.outputPlotCanvas, y))
+        self.status.setText("live | " + pipeline.summary())
+
+    def liveRange(self, canvas, y):
+        """Return the y-range of `canvas`, widened only when `y` leaves it."""
+        low, high = self.liveLimits.get(canvas, (-1.0, 1.0))
+        if y.min() < low:
+            low = y.min() * 1.5
+        if y.max() > high:
+            high = y.max() * 1.5
+        self.liveLimits[canvas] = (low, high)
+        return low, high
+
     # ======== Top Bar function ========
     def generatePlot(self):
         """Generate unfiltered and filtered signal on the canvas."""
@@ -216,39 +481,83 @@ class MainApplication(QtWidgets.QMainWindow):
             # take a filter parameters
             filterType = self.filterTypeCombo.currentText()
             filterOrder = int(self.filterOrderCombo.currentText())
+            filterMode = self.filterModeCombo.currentText()
             passband = inputValidator(self.passbandLineEdit.text())
             stopband = inputValidator(self.stopbandLineEdit.text())
-
-            # it could raise an error with generating plots, so I code try/except
-            try:
-                # generate input signal and save the wave
-                sine = self.inputPlotCanvas.plot(Am1=firstAmplitude, Fs1=firstFrequency, Am2=secondAmplitude, 
-                                                        Fs2=secondFrequency, duration=duration, sampleFrequency=sampleFrequency)
-                # genetate filtered singal using input signal
-                self.outputPlotCanvas.plot(order=filterOrder, lowcut=stopband, highcut=passband, filterType=filterType, 
-                                        samplingRate=sampleFrequency, unfilteredSig=sine, duration=duration)
-
-            except ValueError as e:
-                errorMessage = QtWidgets.QMessageBox()
-                errorMessage.setIcon(QtWidgets.QMessageBox.Critical)
-                errorMessage.setWindowIcon(QtGui.QIcon(self.iconName))
-                errorMessage.setWindowTitle("Value Error")
-                errorMessage.setText("Plot was crashed. Please change the parameters.")
-                errorMessage.setInformativeText(str(e))
-                errorMessage.exec_()
-            # set statusbar text
-            self.status.setText("Generate Plots")
+            multirate = self.multirateCheckBox.isChecked()
+
+            parameters = PlotParameters(firstAmplitude, firstFrequency, secondAmplitude, secondFrequency,
+                                        duration, sampleFrequency, filterType, filterOrder,
+                                        lowcut=stopband, highcut=passband, filterMode=filterMode,
+                                        multirate=multirate)
+            # compute signals off the GUI thread, superseded jobs are cancelled
+            self.cancelJob()
+            self.jobId += 1
+            self.currentJob = PlotWorker(self.jobId, parameters, self.spectrumCache, self.profilePath)
+            self.currentJob.signals.progress.connect(self.onJobProgress)
+            self.currentJob.signals.result.connect(self.onJobResult)
+            self.currentJob.signals.error.connect(self.onJobError)
+            self.currentJob.signals.finished.connect(self.onJobFinished)
+            self.threadPool.start(self.currentJob)
         else:
-            errorMessage = QtWidgets.QMessageBox()
-            errorMessage.setIcon(QtWidgets.QMessageBox.Critical)
-            errorMessage.setWindowIcon(QtGui.QIcon(self.iconName))
-            errorMessage.setWindowTitle("Plotting error")
-            errorMessage.setText("Please fill all parameters before plotting.")
-            errorMessage.exec_()
+            self.showError("Plotting error", "Please fill all parameters before plotting.")
+
+    def cancelJob(self):
+        """Cancel the running computation, its results won't be drawn."""
+        if self.currentJob is not None:
+            self.currentJob.cancel()
+            self.currentJob = None
+            self.status.setText("Ready")
+
+    def onJobProgress(self, jobId, percent, stage):
+        if jobId == self.jobId and self.currentJob is not None:
+            self.status.setText("{}... {}%".format(stage, percent))
+
+    def onJobResult(self, jobId, result):
+        """Draw the signals computed by the worker."""
+        if jobId != self.jobId or self.currentJob is None:
+            return
+        canvases = (self.inputPlotCanvas, self.outputPlotCanvas, self.spectrumPlotCanvas)
+        for canvas in canvases:
+            canvas.renderTime = 0.0
+        with result.timings.stage("update"):
+            self.inputPlotCanvas.drawSignal(result.time, result.unfiltered, result.duration)
+            self.outputPlotCanvas.drawSignal(result.time, result.filtered, result.duration)
+            self.spectrumPlotCanvas.drawSpectrum(result.inputSpectrum, result.outputSpectrum, result.response,
+                                                 self.currentJob.parameters.sampleFrequency)
+        self.lastResult = result
+        self.lastParameters = self.currentJob.parameters
+        # the canvases draw on idle, report once those draws have run
+        QtCore.QTimer.singleShot(0, lambda: self.reportTimings(result.timings, canvases))
+
+    def reportTimings(self, timings, canvases):
+        """Show the stage timings of the last plot in the status bar."""
+        timings.record("draw", sum(canvas.renderTime for canvas in canvases))
+        self.lastTimings = timings
+        # set statusbar text
+        self.status.setText(timings.summary())
+        logger.info("plot timings: %s", timings.summary())
+        if self.profilePath is not None:
+            timings.export_trace(self.profilePath + ".trace.json")
+        self.timingsReady.emit(timings)
+
+    def onJobError(self, jobId, message):
+        if jobId != self.jobId or self.currentJob is None:
+            return
+        self.status.setText("Ready")
+        self.showError("Value Error", "Plot was crashed. Please change the parameters.", message)
+
+    def onJobFinished(self, jobId):
+        if jobId == self.jobId:
+            self.currentJob = None
 
     def clearPlot(self):
+        self.cancelJob()
+        self.liveAction.setChecked(False)
         # clear values
         self.filterTypeCombo.setCurrentIndex(0)
+        self.filterModeCombo.setCurrentIndex(0)
+        self.multirateCheckBox.setChecked(False)
         self.firstAmplitudeLineEdit.setText("")
         self.firstFrequencyLineEdit.setText("")
         self.secondAmplitudeLineEdit.setText("")
@@ -260,6 +569,9 @@ class MainApplication(QtWidgets.QMainWindow):
         # clear plots
         self.inputPlotCanvas.cleanAxes()
         self.outputPlotCanvas.cleanAxes()
+        self.spectrumPlotCanvas.cleanAxes()
+        self.lastResult = None
+        self.lastParameters = None
         self.status.setText("Ready")
         
 
@@ -288,6 +600,8 @@ class MainApplication(QtWidgets.QMainWindow):
         layout2 = QtWidgets.QFormLayout()
         layout2.addRow(self.filterTypeLabel, self.filterOrderLabel)
         layout2.addRow(self.filterTypeCombo, self.filterOrderCombo)
+        layout2.addRow(self.filterModeLabel, self.filterModeCombo)
+        layout2.addRow(self.multirateCheckBox)
         layout2.addRow(self.cutoffLabel)
         layout2.addRow(self.stopbandLineEdit, self.passbandLineEdit)
         filterGroupBox.setLayout(layout2)
@@ -310,8 +624,13 @@ class MainApplication(QtWidgets.QMainWindow):
         horizontalBox.addWidget(self.clearButton)
 
         mainLayout.addLayout(horizontalBox)
+        # zoom & pan toolbars, the canvases redraw their envelopes on change
+        mainLayout.addWidget(NavigationToolbar2QT(self.inputPlotCanvas, self))
         mainLayout.addWidget(self.inputPlotCanvas)
+        mainLayout.addWidget(NavigationToolbar2QT(self.outputPlotCanvas, self))
         mainLayout.addWidget(self.outputPlotCanvas)
+        mainLayout.addWidget(NavigationToolbar2QT(self.spectrumPlotCanvas, self))
+        mainLayout.addWidget(self.spectrumPlotCanvas)
         self.setCentralWidget(centralWidget)
 
     def setValidators(self):
@@ -331,6 +650,17 @@ class MainApplication(QtWidgets.QMainWindow):
 
         self.filterTypeCombo.currentIndexChanged.connect(self.disableUnusedOptions)
 
+        # changing any parameter supersedes the running computation
+        for lineEdit in (self.firstAmplitudeLineEdit, self.firstFrequencyLineEdit,
+                         self.secondAmplitudeLineEdit, self.secondFrequencyLineEdit,
+                         self.passbandLineEdit, self.stopbandLineEdit,
+                         self.durationLineEdit, self.sampleFrequencyLineEdit):
+            lineEdit.textEdited.connect(self.cancelJob)
+        self.filterTypeCombo.currentIndexChanged.connect(self.cancelJob)
+        self.filterOrderCombo.currentIndexChanged.connect(self.cancelJob)
+        self.filterModeCombo.currentIndexChanged.connect(self.cancelJob)
+        self.multirateCheckBox.toggled.connect(self.cancelJob)
+
     def disableUnusedOptions(self):
         """Function for disabling and enabling line edit on the UI."""
         temp = self.filterTypeCombo.currentText()
@@ -0,0 +1,112 @@
+"""Multirate filtering of narrowband designs.
+
+A lowpass or bandpass output holds nothing above its upper cutoff, so the
+signal can be decimated with a polyphase anti-alias filter, filtered at the
+reduced rate and interpolated back. The Butterworth filter then runs on
+1/factor of the samples, but the two resampling passes cost about as much
+as RESAMPLE_COST second-order sections per sample, so only designs with
+many sections (high orders, bandpass, zero-phase) get faster.
+"""
+from functools import lru_cache
+
+import numpy as np
+from scipy.signal import firwin, kaiserord, resample_poly
+
+from filter.engine import design_filter, filter_signal
+
+
+# the reduced Nyquist frequency is kept this factor above the upper cutoff;
+# bilinear warping changes the reduced-rate design near its cutoffs and the
+# causal phase is far more sensitive to that than the zero-phase magnitude
+MULTIRATE_MARGIN = {"causal": 12.0, "zero-phase": 4.0}
+# largest decimation factor chosen automatically
+MAX_DECIMATION = 64
+# stopband attenuation of the anti-alias filter [dB]
+ANTI_ALIAS_ATTENUATION = 80.0
+# decimating and interpolating one sample costs about as much as filtering
+# it with this many second-order sections (measured with benchmarks.multirate)
+RESAMPLE_COST = 10.0
+
+
+@lru_cache(maxsize=64)
+def _anti_alias(factor, edge):
+    """Return the FIR used for both resampling passes.
+
+    `edge` is the upper band edge relative to the Nyquist frequency.
+    Only content below `edge` is kept, so aliases may fall anywhere above
+    it: the stopband starts at 2 / factor - edge, which gives a wide
+    transition band and a short filter.
+    """
+    taps, beta = kaiserord(ANTI_ALIAS_ATTENUATION, 2.0 / factor - 2.0 * edge)
+    # odd length, so resample_poly compensates the delay exactly
+    taps |= 1
+    h = firwin(taps, 1.0 / factor, window=("kaiser", beta))
+    h.setflags(write=False)
+    return h
+
+
+def _upper_edge(filter_type, lowcut, highcut):
+    if filter_type == "lowpass":
+        return lowcut
+    elif filter_type == "bandpass":
+        return highcut
+    elif filter_type in ("highpass", "bandstop"):
+        return None
+    raise ValueError("Filter type '{}' is not supported.".format(filter_type))
+
+
+def decimation_factor(filter_type, order, lowcut, highcut, fs, mode="causal", margin=None,
+                      max_factor=MAX_DECIMATION):
+    """Return the factor `fs` is reduced by for this design, 1 for none.
+
+    The upper band edge is `lowcut` for a lowpass and `highcut` for a
+    bandpass (the GUI convention of `design_filter`); highpass and bandstop
+    outputs reach up to Nyquist and are never decimated. `margin` defaults
+    to MULTIRATE_MARGIN of `mode`. A factor is only
+    returned when the estimated cost, RESAMPLE_COST plus the sections at
+    the reduced rate, is below the cost of filtering at `fs`.
+    """
+    edge = _upper_edge(filter_type, lowcut, highcut)
+    if not edge or edge <= 0:
+        return 1
+    if margin is None:
+        margin = MULTIRATE_MARGIN[mode]
+    factor = max(1, min(int(fs / (2.0 * margin * edge)), max_factor))
+    if factor == 1:
+        return 1
+    sections = design_filter(filter_type, order, lowcut, highcut, fs).shape[0]
+    passes = 2 if mode == "zero-phase" else 1
+    if RESAMPLE_COST + passes * sections / factor >= passes * sections:
+        return 1
+    return factor
+
+
+def filter_multirate(data, filter_type, order, lowcut, highcut, fs, factor=None, interpolate=True,
+                     output="sos", axis=-1, mode="causal"):
+    """Decimate `data`, filter it at `fs / factor` and interpolate it back.
+
+    `factor` None picks `decimation_factor`; a factor of 1 is the plain
+    `filter_signal` call. With `interpolate` the output has the rate and
+    length of `data`, otherwise it stays at the reduced rate.
+
+    The resampling filters are linear phase with their delay compensated,
+    i.e. they use future samples: even in "causal" mode the output is not
+    causal. The design at the reduced rate also differs slightly from the
+    one at `fs` near the cutoffs (bilinear frequency warping).
+    """
+    data = np.asarray(data)
+    if factor is None:
+        factor = decimation_factor(filter_type, order, lowcut, highcut, fs, mode=mode)
+    if factor == 1:
+        return filter_signal(data, filter_type, order, lowcut, highcut, fs, output=output, axis=axis, mode=mode)
+    edge = _upper_edge(filter_type, lowcut, highcut)
+    if edge is None or edge * factor >= fs / 2:
+        raise ValueError("Filter type '{}' with factor {} would alias its output.".format(filter_type, factor))
+    h = _anti_alias(factor, edge / (fs / 2))
+    reduced = resample_poly(data, 1, factor, axis=axis, window=h)
+    y = filter_signal(reduced, filter_type, order, lowcut, highcut, fs / factor, output=output, axis=axis, mode=mode)
+    if not interpolate:
+        return y
+    # the interpolated output is rounded up to whole reduced samples
+    y = resample_poly(y, factor, 1, axis=axis, window=h)
+    return np.take(y, np.arange(data.shape[axis]), axis=axis)
@@ -1,12 +1,36 @@
+import time
+
 import numpy as np
-import pandas as pd
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
 from matplotlib.figure import Figure
-from scipy.signal import butter, filtfilt, lfilter
 
+from filter.engine import filter_signal
+from filter.lod import minmax_envelope
+from filter.signals import Signal, Sine, sine, synthesize, time_base
+from filter.spectrum import to_db
 
-class UnfilteredSignalPlot(FigureCanvasQTAgg):
-    """Sum of Sinusoidal Input Signals y = y1 + y2.
+
+class TimedCanvas(FigureCanvasQTAgg):
+    """Canvas adding up the time spent drawing in `renderTime` [ms]."""
+
+    renderTime = 0.0
+
+    def draw(self):
+        started = time.perf_counter()
+        super().draw()
+        self.renderTime += (time.perf_counter() - started) * 1e3
+
+
+class SignalCanvas(TimedCanvas):
+    """Canvas drawing one signal reduced to per-pixel min/max envelopes.
+
+    The full signal is kept and the drawn line is recomputed whenever the
+    x-range or the canvas size changes, so the drawing cost depends on the
+    width of the canvas and not on the length of the signal.
+
+    The axes are configured once and the line is a persistent animated
+    artist: when the limits don't change only the line is blitted onto the
+    cached background, otherwise a coalesced `draw_idle` is requested.
 
     Parameters
     ----------
@@ -14,51 +38,88 @@ class UnfilteredSignalPlot(FigureCanvasQTAgg):
         Represents a widget to act as the parent of the current object.
     """
 
+    TITLE = ""
+
     def __init__(self, parent=None, width=5, height=2, dpi=70):
         # create the Figure
         fig = Figure(figsize=(width, height), dpi=dpi)   # figsize - in inch
         FigureCanvasQTAgg.__init__(self, fig)
         self.setParent(parent)
+        # full resolution signal
+        self.signal = None
         # create the axes
         self.axes = fig.add_subplot(111)
         self.configureAxes()
-        self.draw()
+        # persistent level-of-detail line, only its data is updated
+        self.line, = self.axes.plot([], [], animated=True)
+        # axes without the line, cached after every full draw
+        self.background = None
+        self.mpl_connect("draw_event", self.onDraw)
+        self.axes.callbacks.connect("xlim_changed", self.updateEnvelope)
+        self.draw_idle()
 
-    def plot(self, Am1=1, Fs1=1, Am2=1, Fs2=1, sampleFrequency=30, section=4800, duration=10):
-        """Draw unfiltered signal.
-        Return y"""
-        # clear current plot
-        self.axes.clear()
-        self.configureAxes()
-        # compute sines
-        sine1 = self.sineGenerator(sampleFrequency, Fs1, Am1, duration)
-        sine2 = self.sineGenerator(sampleFrequency, Fs2, Am2, duration)
-        # create sum of sine
-        sine = sine1 + sine2
-        # set range
-        self.axes.set_xlim(0, duration)
-        self.axes.set_ylim(min(sine.data)*1.1, max(sine.data)*1.1)
-        # create a plot
-        self.axes.plot(sine.index, sine.data)
-        self.draw()
-        return sine
-
-    def sineGenerator(self, sampleFrequency, sineFrequency, sineAmplitude, duration):
-        # number of samples [1/sec * sec]
-        nsamples = sampleFrequency * duration
-        # angular frequency - how many degrees the particle travels per second
-        w = 2.0 * np.pi * sineFrequency
-        # set timeline
-        t_sine = np.linspace(0, duration, nsamples, endpoint=False)
-        # count y(t)
-        y_sine = sineAmplitude * np.sin(w * t_sine)
-        # pack func into pandas DataFrame
-        result = pd.DataFrame({'data': y_sine}, index=t_sine)
-        return result
+    def onDraw(self, event):
+        """Cache the static background and draw the line on top of it."""
+        self.background = self.copy_from_bbox(self.axes.bbox)
+        self.axes.draw_artist(self.line)
+
+    def blitLine(self):
+        """Redraw only the line over the cached background."""
+        if self.background is None:
+            self.draw_idle()
+            return
+        started = time.perf_counter()
+        self.restore_region(self.background)
+        self.axes.draw_artist(self.line)
+        self.blit(self.axes.bbox)
+        self.renderTime += (time.perf_counter() - started) * 1e3
+
+    def drawSignal(self, t, y, duration, xlim=None, ylim=None):
+        """Replace the drawn signal with samples `y` at times `t`.
+
+        The axes span (0, `duration`) and the data range unless `xlim` or
+        `ylim` are given; keeping them fixed keeps redraws on the blit path.
+        """
+        self.signal = (t, y)
+        xlim = (0, duration) if xlim is None else tuple(xlim)
+        ylim = (y.min()*1.1, y.max()*1.1) if ylim is None else tuple(ylim)
+        if self.axes.get_xlim() == xlim and self.axes.get_ylim() == ylim:
+            self.line.set_data(*self.envelope())
+            self.blitLine()
+        else:
+            # ticks change with the range, so the background is redrawn
+            self.axes.set_ylim(*ylim)
+            self.axes.set_xlim(*xlim)
+            self.line.set_data(*self.envelope())
+            self.draw_idle()
+
+    def envelope(self):
+        """Return the signal reduced to the visible range and axes width."""
+        t, y = self.signal
+        xmin, xmax = self.axes.get_xlim()
+        return minmax_envelope(t, y, xmin, xmax, self.axes.bbox.width)
 
+    def updateEnvelope(self, *args):
+        """Recompute the drawn line after a zoom, pan or resize."""
+        if self.signal is None:
+            return
+        self.line.set_data(*self.envelope())
+        self.draw_idle()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.updateEnvelope()
+
+    def print_figure(self, *args, **kwargs):
+        # animated artists are skipped when saving, so draw the line normally
+        self.line.set_animated(False)
+        try:
+            super().print_figure(*args, **kwargs)
+        finally:
+            self.line.set_animated(True)
 
     def configureAxes(self):
-        self.axes.set_title("Generated Signal", size=13)
+        self.axes.set_title(self.TITLE, size=13)
         self.axes.set_ylabel("Amplitude")
         self.axes.set_xlabel("Time [sec]")
         self.axes.set_xlim(0, 1)
@@ -67,12 +128,40 @@ class UnfilteredSignalPlot(FigureCanvasQTAgg):
 
     def cleanAxes(self):
         # clear current plot
-        self.axes.clear()
-        self.configureAxes()
-        self.draw()
+        self.signal = None
+        self.line.set_data([], [])
+        self.axes.set_xlim(0, 1)
+        self.axes.set_ylim(-1, 1)
+        self.draw_idle()
+
+
+class UnfilteredSignalPlot(SignalCanvas):
+    """Sum of Sinusoidal Input Signals y = y1 + y2.
+
+    Parameters
+    ----------
+    `parent` : master widget
+        Represents a widget to act as the parent of the current object.
+    """
+
+    TITLE = "Generated Signal"
+
+    def plot(self, Am1=1, Fs1=1, Am2=1, Fs2=1, sampleFrequency=30, section=4800, duration=10, dtype=np.float64):
+        """Draw unfiltered signal.
+        Return Signal(time, data)"""
+        # compute sum of sines on a shared timeline
+        t, y = synthesize([Sine(Am1, Fs1), Sine(Am2, Fs2)], duration, sampleFrequency, dtype=dtype)
+        self.drawSignal(t, y, duration)
+        return Signal(t, y)
+
+    def sineGenerator(self, sampleFrequency, sineFrequency, sineAmplitude, duration, dtype=np.float64):
+        """Return Signal(time, data) of y(t) = A * sin(2π * f * t)."""
+        # the phase is computed from float64 times, only the result is cast
+        t = time_base(duration, sampleFrequency)
+        return Signal(t.astype(dtype, copy=False), sine(t, sineFrequency, sineAmplitude).astype(dtype, copy=False))
 
 
-class FilteredSignalPlot(FigureCanvasQTAgg):
+class FilteredSignalPlot(SignalCanvas):
     """Canvas clas whitch compute and draws filtred signals. 
 
     Parameters
@@ -81,96 +170,104 @@ class FilteredSignalPlot(FigureCanvasQTAgg):
         Represents a widget to act as the parent of the current object.
     """
 
+    TITLE = "Filtered Signal"
+
+    def plot(self, order=10, lowcut=0.05, highcut=10, filterType="lowpass", samplingRate=30, section=1000, unfilteredSig=None, duration=10, mode="causal"):
+        """Draw filtered signal, `mode` is "causal" or "zero-phase"."""
+        # filter the input signal with the headless engine
+        filtered_sine = filter_signal(unfilteredSig.data, filterType, order, lowcut, highcut, samplingRate, mode=mode)
+        self.drawSignal(unfilteredSig.time, filtered_sine, duration)
+
+
+class SpectrumPlot(TimedCanvas):
+    """Canvas with the input and output magnitude spectra overlaid with
+    the frequency response of the designed filter.
+
+    Parameters
+    ----------
+    `parent` : master widget
+        Represents a widget to act as the parent of the current object.
+    """
+
+    # visible range below the strongest component
+    DYNAMIC_RANGE = 100
+
     def __init__(self, parent=None, width=5, height=2, dpi=70):
         # create the Figure
         fig = Figure(figsize=(width, height), dpi=dpi)   # figsize - in inch
         FigureCanvasQTAgg.__init__(self, fig)
         self.setParent(parent)
-
+        # create the axes
         self.axes = fig.add_subplot(111)
         self.configureAxes()
-        self.axes.plot([1, 2, 3], [1, 2, 3])
-        self.draw()
+        # persistent lines, only their data is updated
+        self.inputLine, = self.axes.plot([], [], label="Input spectrum", alpha=0.6)
+        self.outputLine, = self.axes.plot([], [], label="Output spectrum")
+        self.responseLine, = self.axes.plot([], [], "--", label="Filter response")
+        self.axes.legend(loc="lower left", fontsize="small")
+        self.draw_idle()
 
-    def plot(self, order=10, lowcut=0.05, highcut=10, filterType="lowpass", samplingRate=30, section=1000, unfilteredSig=None, duration=10):
-        """Draw filtered signal."""
-        # clear current plot
-        self.axes.clear()
-        self.configureAxes()
-        # choose appropriate type
-        if filterType == "highpass":
-            filtered_sine = self.butter_highpass_filter(data=unfilteredSig.data, cutoff=highcut, fs=samplingRate, order=order)
-        elif filterType == "lowpass":
-            filtered_sine = self.butter_lowpass_filter(data=unfilteredSig.data, cutoff=lowcut, fs=samplingRate, order=order)
-        elif filterType == "bandpass":
-            filtered_sine = self.butter_bandpass_filter(data=unfilteredSig.data, lowcut=lowcut, highcut=highcut, fs=samplingRate, order=order)
-        elif filterType == "bandstop":
-            filtered_sine = self.butter_bandstop_filter(data=unfilteredSig.data, lowcut=lowcut, highcut=highcut, fs=samplingRate, order=order)
-        else:
-            raise ValueError("Filter type in FilteredSignalPlot is not find!")
+    def drawSpectrum(self, inputSpectrum, outputSpectrum, response, sampleFrequency):
+        """Draw (frequencies, amplitude) pairs of both spectra and the response."""
+        self.inputLine.set_data(inputSpectrum[0], to_db(inputSpectrum[1]))
+        self.outputLine.set_data(outputSpectrum[0], to_db(outputSpectrum[1]))
+        self.responseLine.set_data(response[0], to_db(response[1]))
         # set range
-        self.axes.set_xlim(0, duration)
-        self.axes.set_ylim(min(filtered_sine)*1.1, max(filtered_sine)*1.1)
-        # create a plot
-        self.axes.plot(unfilteredSig.index, filtered_sine)
-        self.draw()
-
-    def butter_highpass(self, cutoff, fs, order=5):
-        # Nyquist frequency | f = f / (fs/2) 
-        nyq = 0.5 * fs
-        normal_cutoff = cutoff / nyq
-        b, a = butter(order, normal_cutoff, btype='high', analog=False)
-        return b, a
-
-    def butter_highpass_filter(self, data, cutoff, fs, order=5):
-        b, a = self.butter_highpass(cutoff, fs, order=order)
-        y = filtfilt(b, a, data)
-        return y
-
-    def butter_lowpass(self, cutoff, fs, order=5):
-        # Nyquist frequency | f = f / (fs/2)
-        nyq = 0.5 * fs
-        normal_cutoff = cutoff / nyq
-        b, a = butter(order, normal_cutoff, btype='low', analog=False)
-        return b, a
-
-    def butter_lowpass_filter(self, data, cutoff, fs, order=5):
-        b, a = self.butter_lowpass(cutoff, fs, order=order)
-        y = lfilter(b, a, data)
-        return y
-
-    def butter_bandpass(self, lowcut, highcut, fs, order=5):
-        # Nyquist frequency | f = f / (fs/2)
-        nyq = 0.5 * fs
-        low = lowcut / nyq
-        high = highcut / nyq
-        b, a = butter(order, [low, high], btype='band')
-        return b, a
-
-    def butter_bandpass_filter(self, data, lowcut, highcut, fs, order=5):
-        b, a = self.butter_bandpass(lowcut, highcut, fs, order=order)
-        y = lfilter(b, a, data)
-        return y
-
-    def butter_bandstop_filter(self, data, lowcut, highcut, fs, order=5):
-        # Nyquist frequency | f = f / (fs/2)
-        nyq = 0.5 * fs
-        low = lowcut / nyq
-        high = highcut / nyq
-        i, u = butter(order, [low, high], btype='bandstop')
-        y = lfilter(i, u, data)
-        return y
+        top = max(to_db(inputSpectrum[1]).max(), 0) + 10
+        self.axes.set_xlim(0, sampleFrequency / 2)
+        self.axes.set_ylim(top - self.DYNAMIC_RANGE, top)
+        self.draw_idle()
 
     def configureAxes(self):
-        self.axes.set_title("Filtered Signal", size=13)
-        self.axes.set_ylabel("Amplitude")
-        self.axes.set_xlabel("Time [sec]")
+        self.axes.set_title("Spectrum", size=13)
+        self.axes.set_ylabel("Magnitude [dB]")
+        self.axes.set_xlabel("Frequency [hz]")
         self.axes.set_xlim(0, 1)
-        self.axes.set_ylim(-1, 1)
+        self.axes.set_ylim(-self.DYNAMIC_RANGE, 10)
         self.axes.grid(True)
 
     def cleanAxes(self):
         # clear current plot
-        self.axes.clear()
+        for line in (self.inputLine, self.outputLine, self.responseLine):
+            line.set_data([], [])
         self.configureAxes()
-        self.draw()
+        self.draw_idle()
+
+
+class SweepHeatmapPlot(FigureCanvasQTAgg):
+    """Heatmap of one sweep metric over filter order and cutoff frequency.
+
+    Parameters
+    ----------
+    `parent` : master widget
+        Represents a widget to act as the parent of the current object.
+    """
+
+    def __init__(self, parent=None, width=6, height=4, dpi=70):
+        # create the Figure
+        fig = Figure(figsize=(width, height), dpi=dpi)   # figsize - in inch
+        FigureCanvasQTAgg.__init__(self, fig)
+        self.setParent(parent)
+        self.axes = fig.add_subplot(111)
+        self.colorbar = None
+        self.draw_idle()
+
+    def plot(self, rows, columns, table, title, rowLabel="Filter order", columnLabel="Cutoff [hz]"):
+        """Draw `table` with one row per value of `rows`."""
+        self.axes.clear()
+        image = self.axes.imshow(np.ma.masked_invalid(table), aspect="auto", origin="lower",
+                                 interpolation="nearest")
+        self.axes.set_title(title, size=13)
+        self.axes.set_ylabel(rowLabel)
+        self.axes.set_xlabel(columnLabel)
+        self.axes.set_yticks(range(len(rows)))
+        self.axes.set_yticklabels([str(r) for r in rows])
+        # label at most ~10 columns
+        step = max(len(columns) // 10, 1)
+        self.axes.set_xticks(range(0, len(columns), step))
+        self.axes.set_xticklabels(["{:g}".format(c) for c in columns[::step]])
+        if self.colorbar is None:
+            self.colorbar = self.figure.colorbar(image, ax=self.axes)
+        else:
+            self.colorbar.update_normal(image)
+        self.draw_idle()
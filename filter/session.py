@@ -0,0 +1,150 @@
+"""Save and load plotting sessions.
+
+A session holds the input and filtered signals, the filter coefficients in
+SOS and ba form, the design and the GUI parameters, so downstream jobs can
+reuse a design tuned in the GUI without going through CSV:
+
+    session = load_session("tuned.npz")
+    y = sosfilt(session.sos, x)
+
+Formats, chosen by the file extension:
+
+    "npz"  - numpy.savez_compressed, members are read on first access
+    "hdf5" - chunked, gzip-compressed datasets, needs h5py
+"""
+import json
+import os
+
+import numpy as np
+
+from filter.engine import design_filter
+
+
+SESSION_FORMATS = ("npz", "hdf5")
+SESSION_EXTENSIONS = {".npz": "npz", ".h5": "hdf5", ".hdf5": "hdf5"}
+SESSION_VERSION = 1
+# samples per HDF5 chunk
+HDF5_CHUNK = 1 << 16
+
+
+def session_format(path):
+    """Return the session format of `path` from its extension."""
+    extension = os.path.splitext(path)[1].lower()
+    try:
+        return SESSION_EXTENSIONS[extension]
+    except KeyError:
+        raise ValueError("Session format of '{}' is not supported.".format(path)) from None
+
+
+def save_session(path, time, unfiltered, filtered, design, parameters, fmt=None, dtype=np.float64, compress=True):
+    """Write one session to `path` and return `path`.
+
+    Parameters
+    ----------
+    `time`, `unfiltered`, `filtered` : the plotted signals
+    `design` : dict
+        `design_filter` keywords: filter_type, order, lowcut, highcut, fs.
+    `parameters` : dict
+        GUI parameters, stored as JSON, e.g. `PlotParameters._asdict()`.
+    `fmt` : str, optional
+        One of SESSION_FORMATS, from the extension when omitted.
+    `dtype` : the signals are stored as this type, e.g. float32 to halve
+        the file; coefficients are always float64.
+    `compress` : bool
+        Compress the arrays.
+    """
+    fmt = fmt or session_format(path)
+    if fmt not in SESSION_FORMATS:
+        raise ValueError("Session format '{}' is not supported.".format(fmt))
+    b, a = design_filter(output="ba", **design)
+    arrays = {
+        "time": np.asarray(time, dtype=dtype),
+        "unfiltered": np.asarray(unfiltered, dtype=dtype),
+        "filtered": np.asarray(filtered, dtype=dtype),
+        "sos": design_filter(output="sos", **design),
+        "b": b,
+        "a": a,
+    }
+    metadata = {"version": SESSION_VERSION, "design": design, "parameters": parameters}
+    if fmt == "npz":
+        save = np.savez_compressed if compress else np.savez
+        save(path, metadata=np.array(json.dumps(metadata)), **arrays)
+    else:
+        _save_hdf5(path, arrays, metadata, compress)
+    return path
+
+
+def _save_hdf5(path, arrays, metadata, compress):
+    import h5py
+    with h5py.File(path, "w") as f:
+        f.attrs["metadata"] = json.dumps(metadata)
+        for name, array in arrays.items():
+            options = {}
+            if compress and array.ndim == 1 and array.size > 0:
+                options = dict(chunks=(min(array.size, HDF5_CHUNK),), compression="gzip", shuffle=True)
+            f.create_dataset(name, data=array, **options)
+
+
+def load_session(path, fmt=None):
+    """Open the session saved in `path`; arrays are read on first access."""
+    fmt = fmt or session_format(path)
+    if fmt == "npz":
+        store = np.load(path, allow_pickle=False)
+        metadata = json.loads(str(store["metadata"]))
+    elif fmt == "hdf5":
+        import h5py
+        store = h5py.File(path, "r")
+        metadata = json.loads(store.attrs["metadata"])
+    else:
+        raise ValueError("Session format '{}' is not supported.".format(fmt))
+    return Session(store, metadata)
+
+
+class Session:
+    """A saved session; use as a context manager or `close` it when done.
+
+    `design` and `parameters` are the dicts passed to `save_session`, the
+    arrays are read from the file once, when first used.
+    """
+
+    def __init__(self, store, metadata):
+        self._store = store
+        self._arrays = {}
+        self.version = metadata["version"]
+        self.design = metadata["design"]
+        self.parameters = metadata["parameters"]
+
+    def array(self, name):
+        """Return the stored array `name`, reading it on first access."""
+        if name not in self._arrays:
+            self._arrays[name] = np.asarray(self._store[name])
+        return self._arrays[name]
+
+    @property
+    def time(self):
+        return self.array("time")
+
+    @property
+    def unfiltered(self):
+        return self.array("unfiltered")
+
+    @property
+    def filtered(self):
+        return self.array("filtered")
+
+    @property
+    def sos(self):
+        return self.array("sos")
+
+    @property
+    def ba(self):
+        return self.array("b"), self.array("a")
+
+    def close(self):
+        self._store.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,156 @@
+"""Signal containers and generators working on plain NumPy arrays.
+
+pandas is only imported when a DataFrame export is asked for.
+"""
+from collections import namedtuple
+
+import numpy as np
+from scipy.signal import chirp
+
+
+class Signal(namedtuple("Signal", ["time", "data"])):
+    """Samples `data` on the time base `time`, both contiguous NumPy arrays."""
+
+    __slots__ = ()
+
+    def to_dataframe(self):
+        """Export the signal as a pandas DataFrame indexed by time."""
+        import pandas as pd
+        return pd.DataFrame({"data": self.data}, index=self.time)
+
+
+def time_base(duration, fs, dtype=np.float64, offset=0):
+    """Return `duration * fs` sample times starting at sample `offset`."""
+    # number of samples [1/sec * sec]
+    nsamples = int(round(duration * fs))
+    # float32 can't count samples past 2**24, so count in float64
+    t = np.arange(offset, offset + nsamples, dtype=np.float64)
+    t /= fs
+    return t.astype(dtype, copy=False)
+
+
+def sine(t, frequency, amplitude=1.0, out=None):
+    """Compute y(t) = A * sin(2π * f * t) into `out` (allocated if None)."""
+    if out is None:
+        out = np.empty_like(t)
+    # angular frequency - how many radians the particle travels per second
+    w = 2.0 * np.pi * frequency
+    np.multiply(t, w, out=out)
+    np.sin(out, out=out)
+    out *= amplitude
+    return out
+
+
+# ======== Synthesizer components ========
+# y = A * sin(2π * f * t + phase)
+Sine = namedtuple("Sine", ["amplitude", "frequency", "phase"], defaults=(1.0, 1.0, 0.0))
+# ±A square wave, `duty` is the fraction of the period spent at +A
+Square = namedtuple("Square", ["amplitude", "frequency", "phase", "duty"], defaults=(1.0, 1.0, 0.0, 0.5))
+# sweep from f0 at 0 sec to f1 at the end of the signal, see scipy.signal.chirp
+Chirp = namedtuple("Chirp", ["amplitude", "f0", "f1", "method"], defaults=(1.0, 1.0, 10.0, "linear"))
+# gaussian noise with standard deviation A
+WhiteNoise = namedtuple("WhiteNoise", ["amplitude"], defaults=(1.0,))
+# 1/f noise with standard deviation A
+PinkNoise = namedtuple("PinkNoise", ["amplitude"], defaults=(1.0,))
+# unit impulses of height A at the given times [sec]
+Impulse = namedtuple("Impulse", ["amplitude", "times"], defaults=(1.0, (0.0,)))
+
+# samples per block of the broadcast sine bank, bounds the temporary memory
+SYNTH_BLOCK = 65536
+
+
+def _pink_noise(rng, nsamples):
+    # shape white noise spectrum by 1/sqrt(f), so the power falls as 1/f
+    spectrum = np.fft.rfft(rng.standard_normal(nsamples))
+    scale = np.arange(spectrum.size, dtype=float)
+    scale[0] = 1.0
+    spectrum /= np.sqrt(scale)
+    spectrum[0] = 0.0
+    noise = np.fft.irfft(spectrum, n=nsamples)
+    std = noise.std()
+    return noise / std if std > 0 else noise
+
+
+def synthesize(components, duration, fs, dtype=np.float64, out=None, seed=None, offset=0, total=None):
+    """Sum any number of signal components on one time base.
+
+    All `Sine` components are generated together as one broadcast
+    (components x samples) expression per block of SYNTH_BLOCK samples.
+
+    Parameters
+    ----------
+    `components` : iterable
+        Sine, Square, Chirp, WhiteNoise, PinkNoise and Impulse instances.
+    `duration`, `fs` : float
+        Length of the signal in seconds and sample frequency in Hz.
+    `dtype` : numpy dtype
+        float64 or float32; phases are always computed in float64.
+    `out` : ndarray, optional
+        Preallocated buffer of `duration * fs` samples to write into.
+    `seed` : int or numpy.random.Generator, optional
+        Seed of the noise generator. A Generator is drawn from and not
+        reset, pass the same one to consecutive blocks to continue the
+        noise of a seeded signal.
+    `offset` : int
+        Index of the first sample, so consecutive blocks of a continuous
+        signal can be generated one after another. Pink noise is shaped
+        over the whole signal and can't be generated from an offset; an
+        int `seed` would repeat the white noise of the first block.
+    `total` : float, optional
+        Length in seconds of the whole signal when it is generated block
+        by block, chirps sweep over it; defaults to `duration` and is
+        required for a Chirp with a non-zero `offset`.
+
+    Returns Signal(time, data).
+    """
+    t = time_base(duration, fs, dtype=dtype, offset=offset)
+    nsamples = t.size
+    if out is None:
+        out = np.zeros(nsamples, dtype=dtype)
+    else:
+        if out.shape != (nsamples,):
+            raise ValueError("Output buffer must have {} samples, got shape {}.".format(nsamples, out.shape))
+        out[...] = 0
+    components = list(components)
+    if total is None:
+        if offset and any(isinstance(c, Chirp) for c in components):
+            raise ValueError("A chirp generated from offset {} needs the total signal length.".format(offset))
+        total = duration
+    if offset and any(isinstance(c, PinkNoise) for c in components):
+        raise ValueError("Pink noise can't be generated from offset {}.".format(offset))
+    seeded = seed is not None and not isinstance(seed, np.random.Generator)
+    if offset and seeded and any(isinstance(c, WhiteNoise) for c in components):
+        raise ValueError("White noise generated from offset {} needs a Generator, not seed {!r}.".format(offset, seed))
+    rng = np.random.default_rng(seed)
+
+    sines = [c for c in components if isinstance(c, Sine)]
+    if sines:
+        amplitudes = np.array([c.amplitude for c in sines], dtype=float)
+        omegas = 2.0 * np.pi * np.array([c.frequency for c in sines], dtype=float)
+        phases = np.array([c.phase for c in sines], dtype=float)[:, np.newaxis]
+        for start in range(0, nsamples, SYNTH_BLOCK):
+            stop = min(start + SYNTH_BLOCK, nsamples)
+            tb = np.arange(offset + start, offset + stop) / fs
+            out[start:stop] += amplitudes @ np.sin(np.multiply.outer(omegas, tb) + phases)
+
+    for component in components:
+        if isinstance(component, Sine):
+            continue
+        elif isinstance(component, Square):
+            cycles = component.frequency * (np.arange(offset, offset + nsamples) / fs) + component.phase / (2.0 * np.pi)
+            out += np.where(cycles % 1.0 < component.duty, component.amplitude, -component.amplitude)
+        elif isinstance(component, Chirp):
+            tb = np.arange(offset, offset + nsamples) / fs
+            out += component.amplitude * chirp(tb, component.f0, total, component.f1, method=component.method)
+        elif isinstance(component, WhiteNoise):
+            # drawn in float64, float32 draws follow another random stream
+            out += component.amplitude * rng.standard_normal(nsamples)
+        elif isinstance(component, PinkNoise):
+            out += component.amplitude * _pink_noise(rng, nsamples)
+        elif isinstance(component, Impulse):
+            indices = np.round(np.asarray(component.times, dtype=float) * fs).astype(int) - offset
+            indices = indices[(indices >= 0) & (indices < nsamples)]
+            np.add.at(out, indices, component.amplitude)
+        else:
+            raise ValueError("Signal component {!r} is not supported.".format(component))
+    return Signal(t, out)
@@ -0,0 +1,95 @@
+"""Magnitude spectra of signals and frequency responses of filter designs."""
+import threading
+from functools import lru_cache
+
+import numpy as np
+from scipy.fft import next_fast_len, rfft, rfftfreq
+from scipy.signal import get_window, sosfreqz, welch
+
+from filter.engine import design_filter
+
+
+# signals longer than this are Welch-averaged instead of one large FFT
+WELCH_THRESHOLD = 1 << 16
+# samples per Welch segment
+WELCH_SEGMENT = 4096
+# frequencies at which a design's response is evaluated
+RESPONSE_POINTS = 1024
+# floor of the dB scale, avoids log10(0)
+DB_FLOOR = 1e-12
+
+
+def to_db(magnitude):
+    return 20.0 * np.log10(np.maximum(magnitude, DB_FLOOR))
+
+
+def magnitude_spectrum(x, fs):
+    """Return (frequencies, amplitude) of the one-sided spectrum of `x`.
+
+    Both paths use a Hann window scaled so a sine of amplitude A peaks at
+    about A. Short signals get one real FFT zero-padded to `next_fast_len`;
+    long ones are averaged over WELCH_SEGMENT sample segments.
+    """
+    x = np.asarray(x)
+    if x.size > WELCH_THRESHOLD:
+        frequencies, power = welch(x, fs, window="hann", nperseg=WELCH_SEGMENT, scaling="spectrum")
+        return frequencies, np.sqrt(2.0 * power)
+    window = get_window("hann", x.size)
+    nfft = next_fast_len(x.size, real=True)
+    spectrum = np.abs(rfft(x * window, n=nfft)) * (2.0 / window.sum())
+    return rfftfreq(nfft, 1.0 / fs), spectrum
+
+
+def response_magnitude(sos, worN, fs, mode="causal"):
+    """Return (frequencies, |H|) of `sos` in `mode`.
+
+    `worN` is the number of frequencies or an array of them in Hz, as for
+    `scipy.signal.sosfreqz`.
+    """
+    frequencies, h = sosfreqz(sos, worN=worN, fs=fs)
+    magnitude = np.abs(h)
+    if mode == "zero-phase":
+        # forward and backward pass
+        magnitude = magnitude ** 2
+    return frequencies, magnitude
+
+
+@lru_cache(maxsize=64)
+def _cached_response(filter_type, order, lowcut, highcut, fs, mode, points):
+    sos = design_filter(filter_type, order, lowcut, highcut, fs)
+    frequencies, magnitude = response_magnitude(sos, points, fs, mode)
+    frequencies.setflags(write=False)
+    magnitude.setflags(write=False)
+    return frequencies, magnitude
+
+
+def frequency_response(filter_type, order, lowcut, highcut, fs, mode="causal", points=RESPONSE_POINTS):
+    """Return (frequencies, |H|) of a design, cached per design.
+
+    The arrays are shared between callers and therefore read-only.
+    """
+    return _cached_response(filter_type, int(order), lowcut, highcut, float(fs), mode, int(points))
+
+
+class SpectrumCache:
+    """Keeps the spectrum of the last input signal.
+
+    When only the filter changes the input signal is the same, so its
+    spectrum is looked up by `key` (e.g. the synthesis parameters) instead
+    of being computed again. Safe to share between worker threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key = None
+        self._spectrum = None
+
+    def spectrum(self, key, x, fs):
+        with self._lock:
+            if key is not None and key == self._key:
+                return self._spectrum
+        spectrum = magnitude_spectrum(x, fs)
+        with self._lock:
+            self._key = key
+            self._spectrum = spectrum
+        return spectrum
@@ -0,0 +1,156 @@
+"""Parallel parameter sweeps over filter type, order and cutoffs.
+
+The input signal is copied once into a shared-memory buffer that every
+worker process maps at start-up, so tasks only carry the few numbers of a
+design and the signal is never pickled per task.
+"""
+import itertools
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing.sharedctypes import RawArray
+
+import numpy as np
+
+from filter.engine import design_filter, filter_signal
+from filter.spectrum import RESPONSE_POINTS, response_magnitude, to_db
+
+
+# one design of the grid
+SweepPoint = namedtuple("SweepPoint", ["filter_type", "order", "lowcut", "highcut"])
+
+# metrics of one design: passband ripple [dB], minimal stopband
+# attenuation [dB], RMS of the filtered signal and filtering time [sec];
+# `error` holds the message when the design is not possible
+SweepResult = namedtuple("SweepResult", ["point", "ripple", "attenuation", "rms", "runtime", "error"])
+
+SWEEP_METRICS = ("ripple", "attenuation", "rms", "runtime")
+
+# passbands end and stopbands start this factor (one octave) away from a cutoff
+TRANSITION = 2.0
+
+# signal shared with the worker processes, set by _attach
+_shared = None
+
+
+def grid(filter_types, orders, lowcuts, highcuts):
+    """Return the SweepPoints of the full grid.
+
+    Band designs with lowcut >= highcut are left out; single cutoff types
+    are enumerated once per cutoff they actually use.
+    """
+    points = []
+    for filter_type, order in itertools.product(filter_types, orders):
+        if filter_type == "lowpass":
+            points.extend(SweepPoint(filter_type, order, low, None) for low in lowcuts)
+        elif filter_type == "highpass":
+            points.extend(SweepPoint(filter_type, order, None, high) for high in highcuts)
+        else:
+            points.extend(SweepPoint(filter_type, order, low, high)
+                          for low, high in itertools.product(lowcuts, highcuts) if low < high)
+    return points
+
+
+def _bands(point, nyq):
+    """Return (passband, stopband) as lists of (start, stop) frequencies.
+
+    Every Butterworth design is -3 dB at its cutoffs, so both regions stay
+    TRANSITION away from them.
+    """
+    low, high = point.lowcut, point.highcut
+    if point.filter_type == "lowpass":
+        return [(0, low / TRANSITION)], [(low * TRANSITION, nyq)]
+    elif point.filter_type == "highpass":
+        return [(high * TRANSITION, nyq)], [(0, high / TRANSITION)]
+    elif point.filter_type == "bandpass":
+        return [(low * TRANSITION, high / TRANSITION)], [(0, low / TRANSITION), (high * TRANSITION, nyq)]
+    elif point.filter_type == "bandstop":
+        return [(0, low / TRANSITION), (high * TRANSITION, nyq)], [(low * TRANSITION, high / TRANSITION)]
+    raise ValueError("Filter type '{}' is not supported.".format(point.filter_type))
+
+
+def design_metrics(point, fs, mode="causal"):
+    """Return (passband ripple, stopband attenuation) of a design in dB.
+
+    |H| is evaluated on a uniform grid plus the exact region edges, so the
+    result doesn't depend on the grid spacing. An empty region (e.g. a
+    bandpass narrower than two octaves) gives NaN.
+    """
+    passband, stopband = _bands(point, fs / 2)
+    edges = [f for start, stop in passband + stopband for f in (start, stop) if 0 <= f <= fs / 2]
+    frequencies = np.union1d(np.linspace(0, fs / 2, RESPONSE_POINTS), edges)
+    _, magnitude = response_magnitude(design_filter(*point, fs=fs), frequencies, fs, mode)
+    db = to_db(magnitude)
+
+    def select(regions):
+        mask = np.zeros(frequencies.size, dtype=bool)
+        for start, stop in regions:
+            mask |= (frequencies >= start) & (frequencies <= stop)
+        return db[mask]
+
+    inside, outside = select(passband), select(stopband)
+    ripple = inside.max() - inside.min() if inside.size else np.nan
+    attenuation = -outside.max() if outside.size else np.nan
+    return ripple, attenuation
+
+
+def evaluate(point, data, fs, mode="causal"):
+    """Filter `data` with one design and return its SweepResult."""
+    try:
+        ripple, attenuation = design_metrics(point, fs, mode)
+        started = time.perf_counter()
+        y = filter_signal(data, *point, fs=fs, mode=mode)
+        runtime = time.perf_counter() - started
+    except ValueError as e:
+        return SweepResult(point, np.nan, np.nan, np.nan, np.nan, str(e))
+    return SweepResult(point, ripple, attenuation, float(np.sqrt(np.mean(y ** 2))), runtime, None)
+
+
+def _attach(buffer, shape):
+    global _shared
+    _shared = np.frombuffer(buffer, dtype=np.float64).reshape(shape)
+
+
+def _evaluate_shared(point, fs, mode):
+    return evaluate(point, _shared, fs, mode)
+
+
+def run_sweep(data, fs, points, mode="causal", processes=None, progress=None):
+    """Evaluate every SweepPoint on `data` in a process pool.
+
+    `progress(done, total)` is called as results arrive. Returns the
+    SweepResults in the order of `points`.
+    """
+    data = np.asarray(data, dtype=np.float64)
+    buffer = RawArray("d", data.size)
+    np.frombuffer(buffer, dtype=np.float64)[:] = data.ravel()
+
+    results = [None] * len(points)
+    with ProcessPoolExecutor(max_workers=processes, initializer=_attach, initargs=(buffer, data.shape)) as pool:
+        futures = {pool.submit(_evaluate_shared, point, fs, mode): i for i, point in enumerate(points)}
+        for done, future in enumerate(as_completed(futures), 1):
+            results[futures[future]] = future.result()
+            if progress is not None:
+                progress(done, len(points))
+    return results
+
+
+def metric_grid(results, metric, rows="order", columns="lowcut", filter_type=None):
+    """Arrange one metric of the results as a 2-D array for a heatmap.
+
+    With `filter_type` only the results of that type are arranged. Points
+    without a value for `rows` or `columns` (the unused cutoff of a lowpass
+    or highpass) are left out. Returns (row values, column values, array)
+    with NaN for missing points.
+    """
+    results = [r for r in results
+               if (filter_type is None or r.point.filter_type == filter_type)
+               and getattr(r.point, rows) is not None and getattr(r.point, columns) is not None]
+    row_values = sorted({getattr(r.point, rows) for r in results})
+    column_values = sorted({getattr(r.point, columns) for r in results})
+    table = np.full((len(row_values), len(column_values)), np.nan)
+    for r in results:
+        i = row_values.index(getattr(r.point, rows))
+        j = column_values.index(getattr(r.point, columns))
+        table[i, j] = getattr(r, metric)
+    return row_values, column_values, table
@@ -0,0 +1,126 @@
+import numpy as np
+from PyQt5 import QtWidgets, QtCore, QtGui
+
+from filter.engine import FILTER_ORDERS
+from filter.plots import SweepHeatmapPlot
+from filter.sweep import SWEEP_METRICS, grid, metric_grid
+from filter.worker import SweepWorker
+
+
+class SweepDialog(QtWidgets.QDialog):
+    """Sweep filter order and cutoff frequency over the plotted signal.
+
+    Parameters
+    ----------
+    `parent` : master widget
+        Represents a widget to act as the parent of the current object.
+    `data`, `sampleFrequency` : the generated input signal
+    `filterType`, `filterMode`, `lowcut`, `highcut` : current filter settings;
+        the cutoff not being swept stays fixed
+    """
+
+    METRIC_TITLES = {
+        "ripple": "Passband ripple [dB]",
+        "attenuation": "Stopband attenuation [dB]",
+        "rms": "Output RMS",
+        "runtime": "Filtering time [sec]",
+    }
+
+    def __init__(self, parent, data, sampleFrequency, filterType, filterMode, lowcut, highcut):
+        super().__init__(parent)
+        self.data = data
+        self.sampleFrequency = sampleFrequency
+        self.filterType = filterType
+        self.filterMode = filterMode
+        self.lowcut = lowcut
+        self.highcut = highcut
+        self.results = None
+        self.threadPool = QtCore.QThreadPool()
+        self.jobId = 0
+
+        self.setWindowTitle("Parameter Sweep - {}".format(filterType))
+        self.createWidgets()
+        self.setupLayout()
+
+    def createWidgets(self):
+        self.ordersLineEdit = QtWidgets.QLineEdit(", ".join(str(o) for o in FILTER_ORDERS))
+        # the highpass cutoff is the passband, every other type sweeps the stopband field
+        swept = self.highcut if self.filterType == "highpass" else self.lowcut
+        self.cutoffFromLineEdit = QtWidgets.QLineEdit("{:g}".format(swept / 4))
+        self.cutoffToLineEdit = QtWidgets.QLineEdit("{:g}".format(min(swept * 2, self.sampleFrequency / 2 * 0.99)))
+        self.cutoffStepsLineEdit = QtWidgets.QLineEdit("20")
+        self.cutoffStepsLineEdit.setValidator(QtGui.QIntValidator(1, 1000))
+
+        self.metricCombo = QtWidgets.QComboBox()
+        self.metricCombo.addItems(SWEEP_METRICS)
+        self.metricCombo.currentIndexChanged.connect(self.showMetric)
+
+        self.runButton = QtWidgets.QPushButton("&Run")
+        self.runButton.clicked.connect(self.runSweep)
+        self.progressBar = QtWidgets.QProgressBar()
+
+        self.heatmapCanvas = SweepHeatmapPlot(self)
+
+    def setupLayout(self):
+        form = QtWidgets.QFormLayout()
+        form.addRow("Filter orders", self.ordersLineEdit)
+        form.addRow("Cutoff from [hz]", self.cutoffFromLineEdit)
+        form.addRow("Cutoff to [hz]", self.cutoffToLineEdit)
+        form.addRow("Cutoff steps", self.cutoffStepsLineEdit)
+        form.addRow("Metric", self.metricCombo)
+
+        controls = QtWidgets.QHBoxLayout()
+        controls.addLayout(form)
+        controls.addWidget(self.runButton)
+
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addLayout(controls)
+        layout.addWidget(self.progressBar)
+        layout.addWidget(self.heatmapCanvas)
+
+    def sweepPoints(self):
+        """Return the SweepPoints described by the inputs."""
+        orders = [int(o) for o in self.ordersLineEdit.text().replace(";", ",").split(",") if o.strip()]
+        start = float(self.cutoffFromLineEdit.text().replace(",", "."))
+        stop = float(self.cutoffToLineEdit.text().replace(",", "."))
+        cutoffs = [float(c) for c in np.linspace(start, stop, int(self.cutoffStepsLineEdit.text()))]
+        if self.filterType == "highpass":
+            return grid([self.filterType], orders, [None], cutoffs)
+        return grid([self.filterType], orders, cutoffs, [self.highcut])
+
+    def runSweep(self):
+        try:
+            points = self.sweepPoints()
+        except ValueError as e:
+            QtWidgets.QMessageBox.critical(self, "Value Error", "Please check the sweep parameters.\n" + str(e))
+            return
+        self.jobId += 1
+        worker = SweepWorker(self.jobId, self.data, self.sampleFrequency, points, self.filterMode)
+        worker.signals.progress.connect(self.onProgress)
+        worker.signals.result.connect(self.onResult)
+        worker.signals.error.connect(self.onError)
+        self.runButton.setDisabled(True)
+        self.progressBar.setValue(0)
+        self.threadPool.start(worker)
+
+    def onProgress(self, jobId, percent, stage):
+        self.progressBar.setValue(percent)
+
+    def onResult(self, jobId, results):
+        self.runButton.setDisabled(False)
+        self.results = results
+        self.showMetric()
+
+    def onError(self, jobId, message):
+        self.runButton.setDisabled(False)
+        QtWidgets.QMessageBox.critical(self, "Sweep error", message)
+
+    def showMetric(self):
+        """Draw the chosen metric of the last sweep as a heatmap."""
+        if not self.results:
+            return
+        metric = self.metricCombo.currentText()
+        columns = "highcut" if self.filterType == "highpass" else "lowcut"
+        rows, cutoffs, table = metric_grid(self.results, metric, rows="order", columns=columns,
+                                           filter_type=self.filterType)
+        self.heatmapCanvas.plot(rows, cutoffs, table, self.METRIC_TITLES[metric])
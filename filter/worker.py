@@ -0,0 +1,180 @@
+"""Background computation of the plotted signals.
+
+Synthesis and filtering run in a QThreadPool worker; only the finished
+arrays are handed back to the GUI thread for drawing.
+"""
+import threading
+from collections import namedtuple
+
+import numpy as np
+from PyQt5 import QtCore
+
+from filter.engine import StreamingFilter, design_filter, iter_zero_phase, zero_phase_padlen
+from filter.multirate import decimation_factor, filter_multirate
+from filter.profiling import StageTimer, profiled
+from filter.signals import Sine, synthesize
+from filter.spectrum import SpectrumCache, frequency_response, magnitude_spectrum
+from filter.sweep import run_sweep
+
+
+# samples filtered between two cancellation checks
+FILTER_BLOCK = 1 << 18
+# zero-phase signals shorter than this many block paddings are filtered in
+# one block, the whole signal is in memory anyway and the overlaps would
+# only be filtered twice
+ZERO_PHASE_SINGLE_BLOCK = 32
+
+
+# input and filter parameters of one Plot click, `multirate` filters at a
+# reduced sample rate when the design allows it
+PlotParameters = namedtuple("PlotParameters", [
+    "firstAmplitude", "firstFrequency", "secondAmplitude", "secondFrequency",
+    "duration", "sampleFrequency", "filterType", "filterOrder", "lowcut", "highcut", "filterMode",
+    "multirate"], defaults=(False,))
+
+# computed signals ready to draw, spectra and response are (frequencies, amplitude),
+# `timings` is the StageTimer of the computation
+PlotResult = namedtuple("PlotResult", [
+    "time", "unfiltered", "filtered", "duration", "inputSpectrum", "outputSpectrum", "response", "timings"])
+
+
+class JobCancelled(Exception):
+    """Raised inside a worker when its job was superseded."""
+
+
+class WorkerSignals(QtCore.QObject):
+    """Signals emitted by PlotWorker, all carrying the job id first."""
+
+    progress = QtCore.pyqtSignal(int, int, str)
+    result = QtCore.pyqtSignal(int, object)
+    error = QtCore.pyqtSignal(int, str)
+    finished = QtCore.pyqtSignal(int)
+
+
+class PlotWorker(QtCore.QRunnable):
+    """Generate and filter the signal for one set of PlotParameters.
+
+    `cancel` may be called from the GUI thread; the worker stops at the
+    next stage or filter block boundary and emits no result. Every stage is
+    timed; with `profilePath` set the whole run is profiled with cProfile.
+    """
+
+    def __init__(self, jobId, parameters, spectrumCache=None, profilePath=None):
+        super().__init__()
+        self.jobId = jobId
+        self.parameters = parameters
+        # spectrum of the input is reused while only the filter changes
+        self.spectrumCache = spectrumCache if spectrumCache is not None else SpectrumCache()
+        self.profilePath = profilePath
+        self.timings = StageTimer()
+        self.signals = WorkerSignals()
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def isCancelled(self):
+        return self._cancelled.is_set()
+
+    def checkCancelled(self):
+        if self._cancelled.is_set():
+            raise JobCancelled()
+
+    def compute(self):
+        """Run every stage and return the PlotResult."""
+        p = self.parameters
+        self.signals.progress.emit(self.jobId, 0, "Generating signal")
+        nsamples = int(round(p.duration * p.sampleFrequency))
+        with self.timings.stage("synthesize", nsamples):
+            t, y = synthesize([Sine(p.firstAmplitude, p.firstFrequency), Sine(p.secondAmplitude, p.secondFrequency)],
+                              p.duration, p.sampleFrequency)
+        self.checkCancelled()
+
+        self.signals.progress.emit(self.jobId, 30, "Filtering signal")
+        factor = 1
+        if p.multirate:
+            factor = decimation_factor(p.filterType, p.filterOrder, p.lowcut, p.highcut, p.sampleFrequency,
+                                       mode=p.filterMode)
+        if factor > 1:
+            # the reduced signal is short, so it is filtered in one call
+            with self.timings.stage("filter", y.size):
+                filtered = filter_multirate(y, p.filterType, p.filterOrder, p.lowcut, p.highcut, p.sampleFrequency,
+                                            factor=factor, mode=p.filterMode)
+        else:
+            filtered = self.filterBlocks(y)
+        self.checkCancelled()
+
+        self.signals.progress.emit(self.jobId, 80, "Computing spectrum")
+        with self.timings.stage("spectrum"):
+            inputKey = p[:6]   # signal parameters, see PlotParameters
+            inputSpectrum = self.spectrumCache.spectrum(inputKey, y, p.sampleFrequency)
+            outputSpectrum = magnitude_spectrum(filtered, p.sampleFrequency)
+            response = frequency_response(p.filterType, p.filterOrder, p.lowcut, p.highcut, p.sampleFrequency,
+                                          mode=p.filterMode)
+        self.checkCancelled()
+        return PlotResult(t, y, filtered, p.duration, inputSpectrum, outputSpectrum, response, self.timings)
+
+    def filterBlocks(self, y):
+        """Filter `y` block by block, checking for cancellation in between."""
+        p = self.parameters
+        with self.timings.stage("design"):
+            if p.filterMode == "zero-phase":
+                sos = design_filter(p.filterType, p.filterOrder, p.lowcut, p.highcut, p.sampleFrequency)
+                blocksize = FILTER_BLOCK
+                if y.size <= ZERO_PHASE_SINGLE_BLOCK * zero_phase_padlen(sos):
+                    blocksize = max(y.size, 1)
+                blocks = iter_zero_phase(sos, y, blocksize)
+            else:
+                # zero initial state matches the one-shot causal filter
+                streamingFilter = StreamingFilter(p.filterType, p.filterOrder, p.lowcut, p.highcut,
+                                                  p.sampleFrequency, initial="zero")
+                blocks = streamingFilter.stream(y[start:start + FILTER_BLOCK]
+                                                for start in range(0, y.size, FILTER_BLOCK))
+        with self.timings.stage("filter", y.size):
+            filtered = np.empty(y.size)
+            start = 0
+            for block in blocks:
+                filtered[start:start + block.size] = block
+                start += block.size
+                self.checkCancelled()
+                self.signals.progress.emit(self.jobId, 30 + 50 * start // max(y.size, 1), "Filtering signal")
+        return filtered
+
+    def run(self):
+        try:
+            with profiled(self.profilePath):
+                result = self.compute()
+            self.signals.progress.emit(self.jobId, 100, "Drawing")
+            self.signals.result.emit(self.jobId, result)
+        except JobCancelled:
+            pass
+        except ValueError as e:
+            self.signals.error.emit(self.jobId, str(e))
+        finally:
+            self.signals.finished.emit(self.jobId)
+
+
+class SweepWorker(QtCore.QRunnable):
+    """Evaluate a grid of SweepPoints on one signal in a process pool."""
+
+    def __init__(self, jobId, data, sampleFrequency, points, mode="causal"):
+        super().__init__()
+        self.jobId = jobId
+        self.data = data
+        self.sampleFrequency = sampleFrequency
+        self.points = points
+        self.mode = mode
+        self.signals = WorkerSignals()
+
+    def onProgress(self, done, total):
+        self.signals.progress.emit(self.jobId, 100 * done // total, "Sweeping")
+
+    def run(self):
+        try:
+            results = run_sweep(self.data, self.sampleFrequency, self.points, mode=self.mode,
+                                progress=self.onProgress)
+            self.signals.result.emit(self.jobId, results)
+        except (OSError, ValueError) as e:
+            self.signals.error.emit(self.jobId, str(e))
+        finally:
+            self.signals.finished.emit(self.jobId)
@@ -1,7 +1,12 @@
+import multiprocessing
+
 from filter.main import main
 
 
 # this means that if this script is executed, then
 # main() will be executed
 if __name__ == '__main__':
+    # frozen (PyInstaller) builds run the sweep's worker processes through
+    # this script, freeze_support starts them instead of a second app
+    multiprocessing.freeze_support()
     main()